@@ -0,0 +1,215 @@
+"""
+Headless batch video-to-event converter (no Qt required).
+
+Examples:
+    python batch_convert.py clip.mp4
+    python batch_convert.py "recordings/*.mp4" -o out --formats evt,packed --no-video
+    python batch_convert.py recordings/ --jobs 4 --threshold 20 --bg black
+    python batch_convert.py clip.mp4 --metrics metrics.jsonl   # per-stage timings as JSON lines
+"""
+import os
+import sys
+import glob
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from main2 import BG_MAP, convert_video
+from metrics import Metrics, MetricsWriter
+from event_file import EventFileReader
+from event_saver import save_event_csv, save_event_npz, save_event_packed, save_event_windows
+
+VIDEO_EXTS = ('.mp4', '.avi', '.mov', '.mkv', '.m4v', '.wmv', '.mpg', '.mpeg')
+FORMATS = ('evt', 'csv', 'npz', 'packed', 'windows')
+
+EXPORTERS = {
+    'csv':    (save_event_csv, '.csv'),
+    'npz':    (save_event_npz, '.npz'),
+    'packed': (save_event_packed, '.v2e'),
+}
+
+
+def expand_inputs(patterns):
+    """Expand files, glob patterns and directories (all videos inside) into a sorted file list."""
+    files = []
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            files.extend(os.path.join(pattern, f) for f in sorted(os.listdir(pattern))
+                         if f.lower().endswith(VIDEO_EXTS))
+        else:
+            matches = sorted(glob.glob(pattern))
+            files.extend(matches if matches else [pattern])
+    # Keep order, drop duplicates
+    return list(dict.fromkeys(files))
+
+
+def convert_file(path, out_dir, formats, video=True, processes=1, verbose=False,
+                 window_ms=5, voxel_bins=5, metrics_path=None, **params):
+    """
+    Convert one video; returns a dict of per-file throughput stats.
+    metrics_path: append per-stage timing snapshots for this file to this JSON-lines file.
+    """
+    metrics = Metrics(sink=MetricsWriter(metrics_path) if metrics_path else None)
+    stem = os.path.splitext(os.path.basename(path))[0]
+    base = os.path.join(out_dir, stem)
+    evt_path = base + '.evt'
+    video_path = base + '_events.avi' if video else None
+
+    start = time.time()
+    frames, events = convert_video(path, video_path, evt_path, processes=processes,
+                                   verbose=verbose, metrics=metrics, **params)
+    convert_time = time.time() - start
+
+    reader = EventFileReader(evt_path)
+    all_events = reader.events
+    for fmt in formats:
+        if fmt in EXPORTERS:
+            save_fn, ext = EXPORTERS[fmt]
+            with metrics.time('save_' + fmt):
+                save_fn(all_events, base + ext)
+    if 'windows' in formats:
+        with metrics.time('save_windows'):
+            save_event_windows(all_events, base + '_windows.npz', int(window_ms * 1000),
+                               reader.width, reader.height, bins=voxel_bins)
+    del all_events
+    reader.close()
+    if 'evt' not in formats:
+        os.remove(evt_path)
+
+    elapsed = time.time() - start
+    stats = {
+        'file': path,
+        'frames': frames,
+        'events': events,
+        'convert_s': convert_time,
+        'total_s': elapsed,
+        'fps': frames / convert_time if convert_time else 0.0,
+        'events_per_s': events / convert_time if convert_time else 0.0,
+    }
+    if metrics.sink is not None:
+        metrics.report(summary=stats)
+        metrics.sink.close()
+    return stats
+
+
+def _convert_job(job):
+    # Top-level wrapper so the job pool can pickle it
+    path, kwargs = job
+    return convert_file(path, **kwargs)
+
+
+def _print_stats(k, n, stats):
+    print(f"[{k}/{n}] {stats['file']}: {stats['frames']} frames, {stats['events']} events, "
+          f"{stats['total_s']:.1f}s ({stats['fps']:.1f} frames/s, {stats['events_per_s']/1e6:.2f} Mev/s)",
+          flush=True)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Convert videos to event streams without a display.")
+    parser.add_argument('inputs', nargs='+', help="video files, glob patterns or directories")
+    parser.add_argument('-o', '--out-dir', default='.', help="output directory (default: current)")
+    parser.add_argument('--threshold', type=int, default=15, help="gray-level difference threshold")
+    parser.add_argument('--decay', type=int, default=10, help="time decay factor")
+    parser.add_argument('--bg', choices=sorted(BG_MAP), default='white', help="event video background")
+    parser.add_argument('--roi', type=int, nargs=4, metavar=('X', 'Y', 'W', 'H'), help="convert only this region")
+    parser.add_argument('--binning', type=int, default=1, help="integer downsampling factor")
+    parser.add_argument('--formats', default='evt',
+                        help=f"comma-separated event log formats from {','.join(FORMATS)} (default: evt)")
+    parser.add_argument('--window-ms', type=float, default=5,
+                        help="time window of the 'windows' format (count frames + voxel grids)")
+    parser.add_argument('--voxel-bins', type=int, default=5,
+                        help="voxel grid time bins of the 'windows' format (0 = count frames only)")
+    parser.add_argument('--no-video', action='store_true', help="do not write the event video")
+    parser.add_argument('--jobs', type=int, default=1, help="videos converted concurrently")
+    parser.add_argument('--processes', type=int, default=1,
+                        help="frame-range processes per video (only used with --jobs 1); with "
+                             "--log-intensity each range replays all earlier frames, so the speedup "
+                             "is limited and needs at least as many cores as processes")
+    parser.add_argument('--workers', type=int, default=1, help="row-stripe threads per generator")
+    parser.add_argument('--log-intensity', action='store_true',
+                        help="DVS log-intensity model (threshold becomes a log contrast in 0.01 steps)")
+    parser.add_argument('--denoise-us', type=int, default=0,
+                        help="background-activity filter window in microseconds (0 = off)")
+    parser.add_argument('--start', type=int, default=0, help="first frame to convert")
+    parser.add_argument('--end', type=int, help="stop before this frame (default: end of video)")
+    parser.add_argument('--step', type=int, default=1, help="convert every n-th frame")
+    parser.add_argument('--metrics', metavar='FILE.jsonl',
+                        help="append per-stage timing snapshots (JSON lines) to this file")
+    parser.add_argument('-q', '--quiet', action='store_true', help="only print per-file summaries")
+    args = parser.parse_args(argv)
+
+    args.formats = [f.strip() for f in args.formats.split(',') if f.strip()]
+    unknown = set(args.formats) - set(FORMATS)
+    if unknown:
+        parser.error(f"unknown format(s): {', '.join(sorted(unknown))}")
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    files = expand_inputs(args.inputs)
+    if not files:
+        print("No input videos found.", file=sys.stderr)
+        return 1
+    os.makedirs(args.out_dir, exist_ok=True)
+
+    jobs = max(1, min(args.jobs, len(files)))
+    kwargs = dict(
+        out_dir=args.out_dir,
+        formats=args.formats,
+        video=not args.no_video,
+        window_ms=args.window_ms,
+        voxel_bins=args.voxel_bins,
+        metrics_path=args.metrics,
+        start=args.start,
+        end=args.end,
+        step=args.step,
+        # Nested pools are avoided: with several concurrent jobs each video runs in one process
+        processes=args.processes if jobs == 1 else 1,
+        verbose=not args.quiet and jobs == 1,
+        threshold=args.threshold,
+        decay=args.decay,
+        bg_color=BG_MAP[args.bg],
+        roi=tuple(args.roi) if args.roi else None,
+        binning=args.binning,
+        workers=args.workers,
+        log_intensity=args.log_intensity,
+        denoise_us=args.denoise_us,
+    )
+
+    failed = 0
+    total_frames = 0
+    start = time.time()
+    if jobs == 1:
+        for k, path in enumerate(files, 1):
+            if not args.quiet:
+                print(f"[{k}/{len(files)}] converting {path}", flush=True)
+            try:
+                stats = convert_file(path, **kwargs)
+            except Exception as e:
+                failed += 1
+                print(f"[{k}/{len(files)}] {path}: FAILED ({e})", file=sys.stderr, flush=True)
+                continue
+            total_frames += stats['frames']
+            _print_stats(k, len(files), stats)
+    else:
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            futures = {pool.submit(_convert_job, (path, kwargs)): path for path in files}
+            for k, future in enumerate(as_completed(futures), 1):
+                try:
+                    stats = future.result()
+                except Exception as e:
+                    failed += 1
+                    print(f"[{k}/{len(files)}] {futures[future]}: FAILED ({e})", file=sys.stderr, flush=True)
+                    continue
+                total_frames += stats['frames']
+                _print_stats(k, len(files), stats)
+
+    elapsed = time.time() - start
+    print(f"Done: {len(files) - failed}/{len(files)} videos, {total_frames} frames in {elapsed:.1f}s "
+          f"({total_frames / elapsed if elapsed else 0.0:.1f} frames/s overall)")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
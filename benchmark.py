@@ -0,0 +1,294 @@
+"""
+Headless benchmark suite for the video-to-event pipeline (CPU only, no Qt, no camera).
+
+Synthesizes test videos (static, slow pan, high-motion noise) at several resolutions and
+reports generator frames/s and events/s, bytes per event and save/load throughput for
+each event format, end-to-end main2 conversion speed and peak memory.
+
+Examples:
+    python benchmark.py --quick
+    python benchmark.py --resolutions 1280x720,1920x1080 --frames 120 --json bench.json
+    python benchmark.py --json new.json --compare bench.json --tolerance 0.2
+
+The log-intensity model on the noise scene emits several events per pixel per frame;
+at 1080p that case alone needs well over 1 GB, so 1080p is not in the default list.
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import tracemalloc
+
+import cv2
+import numpy as np
+
+from event_buffer import EventBuffer, DiscardEvents
+from event_generator import EventGenerator
+from event_file import EventFileReader
+from event_saver import (save_event_csv, save_event_npz, save_event_file, save_event_packed,
+                         load_event_packed)
+from main2 import convert_video
+
+SCENES = ('static', 'pan', 'noise')
+MODES = ('diff', 'log')
+
+# (save function, extension, load function returning something that touches every event)
+FORMATS = {
+    'csv':    (save_event_csv, '.csv',
+               lambda p: np.loadtxt(p, delimiter=',', skiprows=1, dtype=np.int64)),
+    'npz':    (save_event_npz, '.npz',
+               lambda p: [np.load(p)[k] for k in ('x', 'y', 't', 'p')]),
+    'evt':    (save_event_file, '.evt',
+               lambda p: np.array(EventFileReader(p).events)),
+    'packed': (save_event_packed, '.v2e', load_event_packed),
+}
+# CSV is orders of magnitude slower than the binary formats; cap the events it is timed on
+CSV_MAX_EVENTS = 1 << 20
+
+# Metrics where a larger value is a regression; all others are higher-is-better
+LOWER_IS_BETTER = ('bytes_per_event', 'peak_mb')
+
+
+def synth_frames(scene, width, height, n_frames, seed=0):
+    """Yield grayscale frames of a synthetic scene."""
+    rng = np.random.default_rng(seed)
+    # Smooth texture, larger than the frame so the pan never wraps visibly
+    texture = rng.integers(0, 256, (height, width + 2 * n_frames), dtype=np.uint8)
+    texture = cv2.GaussianBlur(texture, (0, 0), 3)
+    texture = cv2.normalize(texture, None, 0, 255, cv2.NORM_MINMAX)
+    for k in range(n_frames):
+        if scene == 'static':
+            # Fixed texture plus mild sensor noise
+            noise = rng.normal(0, 2, (height, width))
+            yield np.clip(texture[:, :width] + noise, 0, 255).astype(np.uint8)
+        elif scene == 'pan':
+            yield np.ascontiguousarray(texture[:, 2 * k:2 * k + width])
+        elif scene == 'noise':
+            yield rng.integers(0, 256, (height, width), dtype=np.uint8)
+        else:
+            raise ValueError(f"unknown scene {scene}")
+
+
+def write_video(path, scene, width, height, n_frames, fps=30.0):
+    out = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'MJPG'), fps, (width, height))
+    for gray in synth_frames(scene, width, height, n_frames):
+        out.write(cv2.cvtColor(gray, cv2.COLOR_GRAY2BGR))
+    out.release()
+
+
+def measure_peak(fn):
+    """Run fn() under tracemalloc and return its peak traced allocation in MB."""
+    tracemalloc.start()
+    try:
+        fn()
+        return tracemalloc.get_traced_memory()[1] / 1e6
+    finally:
+        tracemalloc.stop()
+
+
+def run_generator(frames, mode, threshold, workers, event_buffer=None):
+    # Discard events by default, so generator timings exclude storage growth
+    generator = EventGenerator(event_buffer=DiscardEvents() if event_buffer is None else event_buffer,
+                               reuse_buffers=True, workers=workers, log_intensity=(mode == 'log'))
+    n_events = 0
+    start = time.perf_counter()
+    for k, gray in enumerate(frames):
+        events, _ = generator.generate(gray, threshold=threshold, timestamp=int(k * 1e6 / 30))
+        n_events += len(events)
+    elapsed = time.perf_counter() - start
+    generator.close()
+    return n_events, elapsed
+
+
+def bench_generator(scene, width, height, n_frames, mode, threshold, workers, memory):
+    frames = list(synth_frames(scene, width, height, n_frames))
+    n_events, elapsed = run_generator(frames, mode, threshold, workers)
+    result = {
+        'bench': 'generate', 'scene': scene, 'resolution': f"{width}x{height}", 'mode': mode,
+        'workers': workers, 'frames': n_frames, 'events': n_events,
+        'frames_per_s': n_frames / elapsed,
+        'events_per_s': n_events / elapsed,
+        'ms_per_frame': elapsed * 1e3 / n_frames,
+    }
+    if memory:
+        result['peak_mb'] = measure_peak(lambda: run_generator(frames, mode, threshold, workers))
+    return result
+
+
+def bench_formats(events, tmp_dir, formats, memory):
+    results = []
+    for fmt in formats:
+        save_fn, ext, load_fn = FORMATS[fmt]
+        data = events[:CSV_MAX_EVENTS] if fmt == 'csv' else events
+        path = os.path.join(tmp_dir, 'bench' + ext)
+
+        start = time.perf_counter()
+        save_fn(data, path)
+        save_s = time.perf_counter() - start
+        size = os.path.getsize(path)
+
+        start = time.perf_counter()
+        load_fn(path)
+        load_s = time.perf_counter() - start
+
+        result = {
+            'bench': 'format', 'format': fmt, 'events': len(data),
+            'bytes_per_event': size / max(1, len(data)),
+            'save_events_per_s': len(data) / save_s,
+            'load_events_per_s': len(data) / load_s,
+            'save_mb_per_s': size / 1e6 / save_s,
+        }
+        if memory:
+            result['peak_mb'] = measure_peak(lambda: save_fn(data, path))
+        os.remove(path)
+        results.append(result)
+    return results
+
+
+def bench_convert(scene, width, height, n_frames, threshold, processes, tmp_dir):
+    video = os.path.join(tmp_dir, f"{scene}_{width}x{height}.avi")
+    write_video(video, scene, width, height, n_frames)
+    evt_path = os.path.join(tmp_dir, 'convert.evt')
+    start = time.perf_counter()
+    frames, events = convert_video(video, None, evt_path, processes=processes, verbose=False,
+                                   threshold=threshold)
+    elapsed = time.perf_counter() - start
+    os.remove(evt_path)
+    os.remove(video)
+    return {
+        'bench': 'convert', 'scene': scene, 'resolution': f"{width}x{height}",
+        'processes': processes, 'frames': frames, 'events': events,
+        'frames_per_s': frames / elapsed,
+        'events_per_s': events / elapsed,
+    }
+
+
+def result_key(result):
+    """Identity of a benchmark case, used to match results against a baseline."""
+    fields = ('bench', 'scene', 'resolution', 'mode', 'workers', 'format', 'processes')
+    return '/'.join(str(result[f]) for f in fields if f in result)
+
+
+def print_result(result):
+    key = result_key(result)
+    metrics = ', '.join(f"{name} {value:,.1f}" if isinstance(value, float) else f"{name} {value}"
+                        for name, value in result.items()
+                        if name not in ('bench', 'scene', 'resolution', 'mode', 'workers',
+                                        'format', 'processes'))
+    print(f"{key:40s} {metrics}", flush=True)
+
+
+def compare(results, baseline_path, tolerance):
+    """Print metrics that regressed by more than tolerance; returns the number of regressions."""
+    with open(baseline_path) as f:
+        baseline = {result_key(r): r for r in json.load(f)['results']}
+    regressions = 0
+    for result in results:
+        base = baseline.get(result_key(result))
+        if base is None:
+            continue
+        for name, value in result.items():
+            if not name.endswith(('_per_s', '_per_event', 'peak_mb')) or name not in base:
+                continue
+            old = base[name]
+            if not old:
+                continue
+            change = (value - old) / old
+            worse = change > tolerance if name in LOWER_IS_BETTER else change < -tolerance
+            if worse:
+                regressions += 1
+                print(f"REGRESSION {result_key(result)} {name}: {old:,.1f} -> {value:,.1f} "
+                      f"({change:+.0%})")
+    return regressions
+
+
+def parse_resolutions(text):
+    return [tuple(int(v) for v in r.lower().split('x')) for r in text.split(',') if r]
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the video-to-event pipeline on synthetic videos.")
+    parser.add_argument('--resolutions', default='640x480,1280x720',
+                        help="comma-separated WxH list (default: 640x480,1280x720)")
+    parser.add_argument('--scenes', default=','.join(SCENES), help=f"subset of {','.join(SCENES)}")
+    parser.add_argument('--modes', default=','.join(MODES), help=f"generator models from {','.join(MODES)}")
+    parser.add_argument('--formats', default=','.join(FORMATS), help=f"subset of {','.join(FORMATS)}")
+    parser.add_argument('--frames', type=int, default=60, help="frames per synthetic video")
+    parser.add_argument('--threshold', type=int, default=15, help="generator threshold")
+    parser.add_argument('--workers', type=int, default=1, help="generator row-stripe threads")
+    parser.add_argument('--processes', type=int, default=1, help="main2 frame-range processes")
+    parser.add_argument('--no-memory', action='store_true', help="skip the tracemalloc peak-memory passes")
+    parser.add_argument('--no-convert', action='store_true', help="skip the end-to-end main2 conversion")
+    parser.add_argument('--quick', action='store_true', help="small smoke run: 320x240, 20 frames")
+    parser.add_argument('--json', help="write results to this JSON file")
+    parser.add_argument('--compare', help="baseline JSON to compare against (exit code 1 on regression)")
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help="allowed relative slowdown before a metric counts as regressed")
+    args = parser.parse_args(argv)
+    if args.quick:
+        args.resolutions, args.frames = '320x240', 20
+    args.resolutions = parse_resolutions(args.resolutions)
+    for name, choices in (('scenes', SCENES), ('modes', MODES), ('formats', tuple(FORMATS))):
+        values = [v.strip() for v in getattr(args, name).split(',') if v.strip()]
+        unknown = set(values) - set(choices)
+        if unknown:
+            parser.error(f"unknown {name}: {', '.join(sorted(unknown))}")
+        setattr(args, name, values)
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    memory = not args.no_memory
+    results = []
+    tmp_dir = tempfile.mkdtemp(prefix="v2e_bench_")
+    print(f"Python {platform.python_version()}, NumPy {np.__version__}, OpenCV {cv2.__version__}, "
+          f"{os.cpu_count()} CPUs, {platform.platform()}")
+    try:
+        for width, height in args.resolutions:
+            for scene in args.scenes:
+                for mode in args.modes:
+                    result = bench_generator(scene, width, height, args.frames, mode,
+                                             args.threshold, args.workers, memory)
+                    print_result(result)
+                    results.append(result)
+
+        # Save / load throughput on the events of a slow pan at the largest resolution
+        width, height = max(args.resolutions, key=lambda r: r[0] * r[1])
+        buffer = EventBuffer()
+        frames = synth_frames('pan', width, height, args.frames)
+        run_generator(frames, 'diff', args.threshold, args.workers, event_buffer=buffer)
+        for result in bench_formats(buffer.view(), tmp_dir, args.formats, memory):
+            print_result(result)
+            results.append(result)
+
+        if not args.no_convert:
+            for scene in args.scenes:
+                result = bench_convert(scene, width, height, args.frames, args.threshold,
+                                       args.processes, tmp_dir)
+                print_result(result)
+                results.append(result)
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'python': platform.python_version(), 'numpy': np.__version__,
+                       'opencv': cv2.__version__, 'cpus': os.cpu_count(),
+                       'args': {k: v for k, v in vars(args).items() if k not in ('json', 'compare')},
+                       'results': results}, f, indent=2)
+        print("Results written to", args.json)
+
+    if args.compare:
+        regressions = compare(results, args.compare, args.tolerance)
+        print(f"{regressions} regression(s) against {args.compare}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,31 +1,327 @@
 # camera_stream.py
+import os
+import re
+import time
+import threading
+from collections import deque
+
 import cv2
+import numpy as np
+
+from stage_queue import StageQueue, BLOCK
+
+IMAGE_EXTS = ('.bmp', '.png', '.jpg', '.jpeg', '.tif', '.tiff')
+
+
+def natural_key(name):
+    """自然排序键：frame2 排在 frame10 之前"""
+    return [int(s) if s.isdigit() else s.lower() for s in re.split(r'(\d+)', name)]
 
-class CameraStream:
-    def __init__(self, cam_id=0):
-        self.cap = cv2.VideoCapture(cam_id)
-        if not self.cap.isOpened():
-            raise RuntimeError("无法打开摄像头")
+
+class ImageFolderCapture:
+    """
+    以 cv2.VideoCapture 的接口读取图片目录（按自然顺序），便于无摄像头时测试
+    """
+    def __init__(self, folder, fps=30.0):
+        self.files = [os.path.join(folder, f) for f in sorted(os.listdir(folder), key=natural_key)
+                      if f.lower().endswith(IMAGE_EXTS)]
+        self.fps = fps
+        self.pos = 0
+        first = cv2.imread(self.files[0]) if self.files else None
+        self.size = first.shape[1::-1] if first is not None else (0, 0)
+
+    def isOpened(self):
+        return bool(self.files)
 
     def read(self):
-        ret, frame = self.cap.read()
-        if not ret:
-            return None
-        return frame
+        while self.pos < len(self.files):
+            img = cv2.imread(self.files[self.pos])
+            self.pos += 1
+            if img is not None:
+                return True, img
+        return False, None
+
+    def grab(self):
+        """跳过一帧（不解码），供按步长跳帧时使用"""
+        if self.pos < len(self.files):
+            self.pos += 1
+            return True
+        return False
+
+    def get(self, prop):
+        return {
+            cv2.CAP_PROP_FPS: self.fps,
+            cv2.CAP_PROP_FRAME_WIDTH: self.size[0],
+            cv2.CAP_PROP_FRAME_HEIGHT: self.size[1],
+            cv2.CAP_PROP_FRAME_COUNT: len(self.files),
+            cv2.CAP_PROP_POS_FRAMES: self.pos,
+            # 与视频文件一致：读帧后为刚读出那一帧的时间戳
+            cv2.CAP_PROP_POS_MSEC: max(0, self.pos - 1) * 1000.0 / self.fps,
+        }.get(prop, 0.0)
+
+    def set(self, prop, value):
+        if prop == cv2.CAP_PROP_POS_FRAMES:
+            self.pos = int(value)
+            return True
+        return False
 
     def release(self):
-        self.cap.release()
+        self.files = []
+
+
 class CameraStream:
-    def __init__(self):
-        self.cap = cv2.VideoCapture(0)
+    """
+    摄像头 / 视频文件 / 图片目录的统一帧源
+
+    source:      摄像头编号、视频文件路径或图片目录
+    width/height/fps/fourcc: 向摄像头协商的格式（默认 MJPG，多数 USB 摄像头在 720p 下
+                 只有 MJPG 能跑满帧率）；实际生效值见 info()
+    buffer_size: 驱动缓冲帧数，1 表示尽量不积压旧帧
+    grab_latest: 后台线程持续取帧，read() 总是返回最新一帧（旧帧直接丢弃）
+    realtime:    文件 / 目录源按其帧率节流播放，模拟实时摄像头
+    """
+    def __init__(self, source=0, width=None, height=None, fps=None, fourcc='MJPG',
+                 buffer_size=1, grab_latest=True, realtime=True):
+        self.source = source
+        self.is_camera = isinstance(source, int)
+        if self.is_camera:
+            self.cap = cv2.VideoCapture(source)
+        elif os.path.isdir(source):
+            self.cap = ImageFolderCapture(source, fps=fps or 30.0)
+        else:
+            self.cap = cv2.VideoCapture(source)
+        if not self.cap.isOpened():
+            raise RuntimeError(f"无法打开视频源：{source}")
+
+        if self.is_camera:
+            # 先设 FOURCC 再设分辨率/帧率，部分驱动只在该顺序下生效
+            if fourcc:
+                self.cap.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*fourcc))
+            if width and height:
+                self.set_resolution(width, height)
+            if fps:
+                self.cap.set(cv2.CAP_PROP_FPS, fps)
+            if buffer_size:
+                self.cap.set(cv2.CAP_PROP_BUFFERSIZE, buffer_size)
+
+        self.realtime = realtime and not self.is_camera
+        self._frame_interval = 1.0 / (self.cap.get(cv2.CAP_PROP_FPS) or 30.0)
+
+        # 取帧时间间隔（用于统计实际帧率与抖动）
+        self._intervals = deque(maxlen=120)
+        self._last_grab = None
+        self._next_due = None
+        self._eof = False
+
+        self._latest = None
+        self._latest_ts = 0
+        self._seq = 0
+        self._read_seq = 0
+        self._cond = threading.Condition()
+        self._running = False
+        self._thread = None
+        if grab_latest:
+            self._running = True
+            self._thread = threading.Thread(target=self._grab_loop, daemon=True)
+            self._thread.start()
 
     def set_resolution(self, width, height):
         self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, width)
         self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, height)
 
-    def read(self):
+    def _read_frame(self):
+        # 文件源节流到其自身帧率
+        if self.realtime:
+            now = time.perf_counter()
+            if self._next_due is not None and now < self._next_due:
+                time.sleep(self._next_due - now)
+            self._next_due = max(now, self._next_due or now) + self._frame_interval
         ret, frame = self.cap.read()
-        return frame if ret else None
+        ts = int(time.time() * 1e6)
+        now = time.perf_counter()
+        if ret:
+            if self._last_grab is not None:
+                self._intervals.append(now - self._last_grab)
+            self._last_grab = now
+        elif not self.is_camera:
+            self._eof = True
+        return (frame if ret else None), ts
+
+    def _grab_loop(self):
+        while self._running:
+            frame, ts = self._read_frame()
+            if frame is None and not self._eof:
+                # 摄像头偶发读帧失败（掉帧、USB 抖动）：稍后重试，不结束采集
+                time.sleep(0.01)
+                continue
+            with self._cond:
+                if frame is None:
+                    # 文件 / 目录源读完
+                    self._running = False
+                else:
+                    self._latest, self._latest_ts = frame, ts
+                    self._seq += 1
+                self._cond.notify_all()
+
+    def read_with_timestamp(self, timeout=1.0):
+        """返回 (最新帧, 采集时间戳微秒)；无新帧或源已结束时返回 (None, 0)"""
+        if self._thread is None:
+            return self._read_frame()
+        with self._cond:
+            # 等待比上次读取更新的帧，避免重复处理同一帧
+            if not self._cond.wait_for(lambda: self._seq > self._read_seq or not self._running, timeout):
+                return None, 0
+            if self._seq == self._read_seq:
+                return None, 0
+            self._read_seq = self._seq
+            return self._latest, self._latest_ts
+
+    def read(self):
+        frame, _ = self.read_with_timestamp()
+        return frame
+
+    def info(self):
+        """实际协商得到的格式"""
+        code = int(self.cap.get(cv2.CAP_PROP_FOURCC))
+        fourcc = ''.join(chr((code >> (8 * i)) & 0xFF) for i in range(4)) if code else ''
+        return {
+            'source': self.source,
+            'width': int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+            'height': int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+            'fps': self.cap.get(cv2.CAP_PROP_FPS),
+            'fourcc': fourcc.strip('\0'),
+            'buffer_size': int(self.cap.get(cv2.CAP_PROP_BUFFERSIZE)) if self.is_camera else 0,
+            'grab_latest': self._thread is not None,
+        }
+
+    def stats(self):
+        """最近约 120 帧的实际取帧帧率与抖动（间隔标准差，毫秒）"""
+        intervals = np.array(self._intervals)
+        if len(intervals) < 2:
+            return {'fps': 0.0, 'interval_ms': 0.0, 'jitter_ms': 0.0, 'max_interval_ms': 0.0}
+        return {
+            'fps': float(1.0 / intervals.mean()),
+            'interval_ms': float(intervals.mean() * 1e3),
+            'jitter_ms': float(intervals.std() * 1e3),
+            'max_interval_ms': float(intervals.max() * 1e3),
+        }
+
+    @property
+    def finished(self):
+        """文件 / 目录源已读完"""
+        if self._thread is None:
+            return self._eof
+        return not self._running and self._seq == self._read_seq
 
     def release(self):
+        self._running = False
+        if self._thread is not None:
+            self._thread.join(timeout=2.0)
+        self.cap.release()
+
+
+class VideoReader:
+    """
+    离线处理用的预读帧源：后台线程解码（及按需转灰度）到有界队列，解码与处理重叠进行
+
+    source:     视频文件或图片目录
+    start/end:  帧号区间 [start, end)，end 为 None 时读到结尾
+    start_ms/end_ms: 按时间（毫秒）给出区间，按帧率换算成帧号，与 start/end 同时给出时取交集
+    step:       帧步长，跳过的帧只 grab() 不取出
+    gray:       直接输出灰度帧
+    queue_size: 预读帧数上限（限制内存）
+
+    迭代得到 (帧号, 时间戳微秒, 帧)；时间戳取自视频容器（CAP_PROP_POS_MSEC），
+    取不到时按 帧号 / 帧率 计算。用完调用 close()，或用 with 语句
+    """
+    def __init__(self, source, start=0, end=None, start_ms=None, end_ms=None, step=1, gray=False,
+                 queue_size=8):
+        self.source = source
+        self.cap = ImageFolderCapture(source) if os.path.isdir(source) else cv2.VideoCapture(source)
+        if not self.cap.isOpened():
+            raise IOError(f"cannot open video file {source}")
+        self.fps = self.cap.get(cv2.CAP_PROP_FPS) or 30.0
+        self.width = int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+        self.height = int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        self.frame_count = int(self.cap.get(cv2.CAP_PROP_FRAME_COUNT))
+
+        start = max(0, int(start))
+        if start_ms is not None:
+            start = max(start, int(np.ceil(start_ms * self.fps / 1000 - 1e-9)))
+        if end_ms is not None:
+            end_ms_frame = int(np.ceil(end_ms * self.fps / 1000 - 1e-9))
+            end = end_ms_frame if end is None else min(int(end), end_ms_frame)
+        self.start, self.end, self.step = start, end, max(1, int(step))
+        self.gray = gray
+
+        self._queue = StageQueue(queue_size, BLOCK)
+        self._running = True
+        self._done = False
+        self._error = None
+        self._thread = threading.Thread(target=self._decode_loop, daemon=True)
+        self._thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _put(self, item):
+        # 队列满时等待消费者；close() 后放弃
+        while self._running:
+            if self._queue.push(item, timeout=0.1):
+                return True
+        return False
+
+    def _decode_loop(self):
+        try:
+            if self.start > 0:
+                self.cap.set(cv2.CAP_PROP_POS_FRAMES, self.start)
+            idx = self.start
+            while self._running and (self.end is None or idx < self.end):
+                ret, frame = self.cap.read()
+                if not ret:
+                    break
+                pos_ms = self.cap.get(cv2.CAP_PROP_POS_MSEC)
+                ts = int(round(pos_ms * 1000)) if pos_ms > 0 or idx == 0 else int(round(idx * 1e6 / self.fps))
+                if self.gray:
+                    frame = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+                if not self._put((idx, ts, frame)):
+                    return
+                # 步长内的其余帧只 grab，不取出图像
+                for _ in range(self.step - 1):
+                    if not self.cap.grab():
+                        break
+                idx += self.step
+        except Exception as e:
+            self._error = e
+        finally:
+            self._put(None)
+
+    def read(self):
+        """返回下一帧 (帧号, 时间戳微秒, 帧)；读完时返回 None，解码出错时抛出该异常"""
+        if self._done:
+            return None
+        item = self._queue.get()
+        if item is None:
+            self._done = True
+            self._running = False
+            if self._error is not None:
+                raise self._error
+        return item
+
+    def __iter__(self):
+        while True:
+            item = self.read()
+            if item is None:
+                return
+            yield item
+
+    def close(self):
+        self._running = False
+        # 清空队列，让阻塞在 put 上的解码线程退出
+        while self._queue.pop_latest() is not None:
+            pass
+        self._thread.join(timeout=2.0)
         self.cap.release()
@@ -0,0 +1,271 @@
+# 文件：event_buffer.py
+import os
+import queue
+import threading
+import numpy as np
+
+# 事件记录格式：x/y 为像素坐标，t 为微秒时间戳，p 为极性（+1 / -1）
+EVENT_DTYPE = np.dtype([('x', np.uint16), ('y', np.uint16), ('t', np.int64), ('p', np.int8)])
+
+
+def empty_events(n=0):
+    """创建长度为 n 的空事件批次"""
+    return np.empty(n, dtype=EVENT_DTYPE)
+
+
+def as_event_array(events):
+    """
+    将事件批次统一转换为 EVENT_DTYPE 结构化数组
+    支持：结构化数组（含 np.memmap）、EventBuffer、EventRingBuffer、(x, y, t, p) 元组列表
+    """
+    if isinstance(events, EventBuffer):
+        return events.view()
+    if isinstance(events, EventRingBuffer):
+        return events.snapshot()
+    if isinstance(events, np.ndarray) and events.dtype == EVENT_DTYPE:
+        return events
+    if isinstance(events, np.ndarray) and events.dtype.names:
+        out = empty_events(len(events))
+        for name in EVENT_DTYPE.names:
+            out[name] = events[name]
+        return out
+    return np.array([tuple(e) for e in events], dtype=EVENT_DTYPE)
+
+
+class DiscardEvents:
+    """
+    不保存任何事件的存储：事件由调用方自行处理（如 pipeline.py 的输出阶段）时交给 EventGenerator
+    """
+    def __len__(self):
+        return 0
+
+    def extend(self, events):
+        pass
+
+
+class EventBuffer:
+    """
+    可增长的列式事件存储（按需倍增容量，避免逐事件创建 Python 对象）
+    """
+    def __init__(self, capacity=1 << 16):
+        self._data = empty_events(max(1, int(capacity)))
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return self._size
+
+    def __getitem__(self, key):
+        return self.view()[key]
+
+    def extend(self, events):
+        events = as_event_array(events)
+        n = len(events)
+        if n == 0:
+            return
+        with self._lock:
+            need = self._size + n
+            if need > len(self._data):
+                cap = len(self._data)
+                while cap < need:
+                    cap *= 2
+                grown = empty_events(cap)
+                grown[:self._size] = self._data[:self._size]
+                self._data = grown
+            self._data[self._size:need] = events
+            self._size = need
+
+    def view(self):
+        """当前已存事件的视图（不复制）"""
+        return self._data[:self._size]
+
+    def copy(self):
+        with self._lock:
+            return self._data[:self._size].copy()
+
+    def clear(self):
+        with self._lock:
+            self._size = 0
+
+    @property
+    def nbytes(self):
+        return self._size * EVENT_DTYPE.itemsize
+
+    def snapshot(self):
+        return self.copy()
+
+    def close(self, delete=False):
+        pass
+
+
+class _SpillWriter(threading.Thread):
+    """
+    后台落盘线程：将事件块按到达顺序追加写入 .evt 记录文件
+    """
+    def __init__(self, path, max_pending=8):
+        super().__init__(daemon=True)
+        from event_file import EventFileWriter
+        self.path = path
+        self.chunks = queue.Queue(maxsize=max_pending)
+        self.error = None
+        self._file = EventFileWriter(path)
+
+    def run(self):
+        while True:
+            chunk = self.chunks.get()
+            try:
+                if chunk is None:
+                    break
+                self._file.append(chunk)
+            except Exception as e:
+                self.error = e
+            finally:
+                self.chunks.task_done()
+        self._file.close()
+
+    def put(self, chunk):
+        if self.error is not None:
+            raise IOError(f"事件落盘失败：{self.error}")
+        self.chunks.put(chunk)
+
+    def flush(self):
+        self.chunks.join()
+        self._file.flush()
+
+    def close(self):
+        self.chunks.put(None)
+        self.join()
+
+
+class EventRingBuffer:
+    """
+    固定容量、预分配的环形事件缓冲，内存占用不随会话时长增长
+
+    - 不落盘时：只保留最近 capacity 个事件，更早的事件被覆盖（计入 dropped）
+    - 指定 spill_path 时：较旧的事件按 chunk_size 分块交给后台线程追加写入 .evt 记录
+      （见 event_file.py），snapshot() 只需写出尾部剩余事件并以内存映射方式返回完整记录；
+      clear() 换用新的落盘文件（<spill_path 主名>_1.evt、_2.evt …），不截断仍可能被快照读取的旧文件
+    """
+    def __init__(self, capacity=1 << 22, spill_path=None, chunk_size=1 << 18):
+        self.capacity = int(capacity)
+        self._data = empty_events(self.capacity)
+        self._total = 0      # 累计写入事件数
+        self._spilled = 0    # 已交给落盘线程的事件数
+        self._lock = threading.Lock()
+
+        self.spill_path = spill_path
+        self._spill_files = [] if spill_path is None else [spill_path]
+        self.chunk_size = max(1, min(int(chunk_size), self.capacity // 2))
+        self._writer = None
+        if spill_path is not None:
+            self._writer = _SpillWriter(spill_path)
+            self._writer.start()
+
+    def __len__(self):
+        return min(self._total, self.capacity)
+
+    @property
+    def total(self):
+        return self._total
+
+    @property
+    def dropped(self):
+        """被覆盖且未落盘的事件数"""
+        if self._writer is not None:
+            return 0
+        return max(0, self._total - self.capacity)
+
+    @property
+    def nbytes(self):
+        return self._data.nbytes
+
+    def _write(self, events):
+        # 写入环形区，必要时分两段回绕
+        n = len(events)
+        start = self._total % self.capacity
+        first = min(n, self.capacity - start)
+        self._data[start:start + first] = events[:first]
+        if first < n:
+            self._data[:n - first] = events[first:]
+        self._total += n
+
+    def _ordered(self, begin, end):
+        # 按绝对序号 [begin, end) 取出事件副本（调用方保证仍在环内）
+        n = end - begin
+        start = begin % self.capacity
+        first = min(n, self.capacity - start)
+        if first == n:
+            return self._data[start:start + n].copy()
+        return np.concatenate((self._data[start:], self._data[:n - first]))
+
+    def _spill(self, final=False):
+        while self._total - self._spilled >= self.chunk_size:
+            end = self._spilled + self.chunk_size
+            self._writer.put(self._ordered(self._spilled, end))
+            self._spilled = end
+        if final and self._total > self._spilled:
+            self._writer.put(self._ordered(self._spilled, self._total))
+            self._spilled = self._total
+
+    def extend(self, events):
+        events = as_event_array(events)
+        n = len(events)
+        if n == 0:
+            return
+        with self._lock:
+            if self._writer is None:
+                # 超出容量的部分只保留最新的 capacity 个
+                if n > self.capacity:
+                    self._total += n - self.capacity
+                    events = events[n - self.capacity:]
+                self._write(events)
+                return
+            # 分段写入，保证未落盘的事件不会被覆盖
+            for i in range(0, n, self.chunk_size):
+                self._write(events[i:i + self.chunk_size])
+                self._spill()
+
+    def recent(self):
+        """环内最近的事件（按时间顺序的副本）"""
+        with self._lock:
+            return self._ordered(self._total - len(self), self._total)
+
+    def snapshot(self):
+        """
+        完整记录：落盘模式下返回磁盘文件的只读内存映射，否则返回环内事件副本
+        """
+        if self._writer is None:
+            return self.recent()
+        with self._lock:
+            self._spill(final=True)
+            self._writer.flush()
+            from event_file import EventFileReader
+            return EventFileReader(self.spill_path).events
+
+    def copy(self):
+        return np.array(self.snapshot())
+
+    def clear(self):
+        with self._lock:
+            if self._writer is not None:
+                # 在新文件中重新开始一份空记录：旧文件可能正被 snapshot() 的内存映射读取（如后台保存）
+                self._writer.close()
+                root, ext = os.path.splitext(self._spill_files[0])
+                self.spill_path = f"{root}_{len(self._spill_files)}{ext}"
+                self._spill_files.append(self.spill_path)
+                self._writer = _SpillWriter(self.spill_path)
+                self._writer.start()
+            self._total = 0
+            self._spilled = 0
+
+    def close(self, delete=False):
+        """停止落盘线程；delete=True 时同时删除所有落盘文件"""
+        if self._writer is not None:
+            with self._lock:
+                self._spill(final=True)
+            self._writer.close()
+            self._writer = None
+            if delete:
+                for path in self._spill_files:
+                    if os.path.exists(path):
+                        os.remove(path)
@@ -0,0 +1,162 @@
+# 文件：event_file.py
+# 分块二进制事件记录格式（.evt）
+#
+#   [文件头 64 字节][定长事件记录 × N][稀疏时间索引]
+#
+# 事件记录与 EVENT_DTYPE 逐字节一致，可直接内存映射；索引每 index_stride 个事件
+# 记录一次 (t, 记录序号)，用于按时间段定位而无需读取整个文件。
+import os
+import struct
+import numpy as np
+
+from event_buffer import EVENT_DTYPE, as_event_array, empty_events
+
+MAGIC = b'V2EEVT\x00\x01'
+VERSION = 1
+HEADER_SIZE = 64
+# magic, version, record_size, width, height, index_stride, n_events, index_offset, index_count
+_HEADER = struct.Struct('<8sIIHHIQQQ')
+
+INDEX_DTYPE = np.dtype([('t', np.int64), ('offset', np.uint64)])
+
+
+class EventFileWriter:
+    """
+    事件记录追加写入器：可作为 EventGenerator 的 event_buffer 使用（提供 extend）
+    要求写入的时间戳单调不减，关闭时写入稀疏索引
+    """
+    def __init__(self, path, width=0, height=0, index_stride=4096):
+        self.path = path
+        self.width = width
+        self.height = height
+        self.index_stride = int(index_stride)
+        self.n_events = 0
+        self._last_t = None
+        self._index = []
+        self._file = open(path, 'wb')
+        self._write_header(index_offset=0, index_count=0)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        return self.n_events
+
+    def _write_header(self, index_offset, index_count):
+        header = _HEADER.pack(MAGIC, VERSION, EVENT_DTYPE.itemsize, self.width, self.height,
+                              self.index_stride, self.n_events, index_offset, index_count)
+        self._file.seek(0)
+        self._file.write(header.ljust(HEADER_SIZE, b'\0'))
+        self._file.seek(0, os.SEEK_END)
+
+    def append(self, events):
+        events = as_event_array(events)
+        n = len(events)
+        if n == 0:
+            return
+        t = events['t']
+        if (self._last_t is not None and t[0] < self._last_t) or np.any(t[1:] < t[:-1]):
+            raise ValueError("事件时间戳必须单调不减")
+
+        # 本批次中落在索引步长整数倍上的记录
+        first = -self.n_events % self.index_stride
+        if first < n:
+            pos = np.arange(first, n, self.index_stride)
+            entries = np.empty(len(pos), dtype=INDEX_DTYPE)
+            entries['t'] = t[pos]
+            entries['offset'] = pos + self.n_events
+            self._index.append(entries)
+
+        events.tofile(self._file)
+        self.n_events += n
+        self._last_t = int(t[-1])
+
+    extend = append
+
+    def flush(self):
+        """更新文件头中的事件数，使读取端可以打开尚未关闭的记录"""
+        self._write_header(index_offset=0, index_count=0)
+        self._file.flush()
+
+    def close(self):
+        if self._file.closed:
+            return
+        index = np.concatenate(self._index) if self._index else np.empty(0, dtype=INDEX_DTYPE)
+        index_offset = self._file.tell()
+        index.tofile(self._file)
+        self._write_header(index_offset=index_offset, index_count=len(index))
+        self._file.close()
+
+
+class EventFileReader:
+    """
+    以内存映射方式读取 .evt 记录，支持按时间段与像素 ROI 查询
+    """
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            header = f.read(HEADER_SIZE)
+        if len(header) < HEADER_SIZE or header[:8] != MAGIC:
+            raise ValueError(f"不是有效的事件记录文件：{path}")
+        (_, version, record_size, self.width, self.height, self.index_stride,
+         n_events, index_offset, index_count) = _HEADER.unpack_from(header)
+        if record_size != EVENT_DTYPE.itemsize:
+            raise ValueError(f"事件记录长度不匹配：{record_size} != {EVENT_DTYPE.itemsize}")
+
+        if index_offset == 0:
+            # 记录尚未关闭：以文件大小为准，并现场抽样重建索引
+            n_events = (os.path.getsize(path) - HEADER_SIZE) // record_size
+        self.events = (np.memmap(path, dtype=EVENT_DTYPE, mode='r', offset=HEADER_SIZE, shape=(n_events,))
+                       if n_events else empty_events())
+
+        if index_offset and index_count:
+            self.index = np.fromfile(path, dtype=INDEX_DTYPE, count=index_count, offset=index_offset)
+        else:
+            pos = np.arange(0, n_events, max(1, self.index_stride))
+            self.index = np.empty(len(pos), dtype=INDEX_DTYPE)
+            self.index['t'] = self.events['t'][pos]
+            self.index['offset'] = pos
+
+    def __len__(self):
+        return len(self.events)
+
+    def _search(self, t):
+        # 先在稀疏索引中定位所在块，再在块内二分查找第一个 >= t 的记录
+        k = np.searchsorted(self.index['t'], t, side='left')
+        lo = int(self.index['offset'][k - 1]) if k > 0 else 0
+        hi = int(self.index['offset'][k]) if k < len(self.index) else len(self.events)
+        return lo + int(np.searchsorted(self.events['t'][lo:hi], t, side='left'))
+
+    def time_slice(self, t0=None, t1=None):
+        """时间段 [t0, t1) 对应的记录序号范围"""
+        start = 0 if t0 is None else self._search(t0)
+        stop = len(self.events) if t1 is None else self._search(t1)
+        return slice(start, max(start, stop))
+
+    def time_range(self, t0=None, t1=None):
+        """时间段 [t0, t1)（微秒）内的事件，返回内存映射视图，不复制"""
+        return self.events[self.time_slice(t0, t1)]
+
+    def roi(self, x0, y0, x1, y1, t0=None, t1=None, chunk_size=1 << 20):
+        """
+        像素 ROI [x0, x1) × [y0, y1) 内的事件（可叠加时间段），逐块过滤以限制内存
+        """
+        sel = self.time_slice(t0, t1)
+        parts = []
+        for i in range(sel.start, sel.stop, chunk_size):
+            block = self.events[i:min(i + chunk_size, sel.stop)]
+            x, y = block['x'], block['y']
+            mask = (x >= x0) & (x < x1) & (y >= y0) & (y < y1)
+            parts.append(np.asarray(block[mask]))
+        return np.concatenate(parts) if parts else empty_events()
+
+    def iter_chunks(self, chunk_size=1 << 20):
+        for i in range(0, len(self.events), chunk_size):
+            yield self.events[i:i + chunk_size]
+
+    def close(self):
+        # 仅释放引用；外部仍持有的视图在其被回收后自动解除映射
+        self.events = empty_events()
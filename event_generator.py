@@ -1,49 +1,471 @@
 # 文件：event_generator.py
 import numpy as np
+import cv2
 import time
+from concurrent.futures import ThreadPoolExecutor
+
+from event_buffer import EVENT_DTYPE, EventBuffer, empty_events
+
+# 时间面：decay 滑块每一档对应的衰减时间常数（微秒）
+DECAY_UNIT_US = 10000
+# 从未触发过事件的像素的时间戳
+SURFACE_EMPTY = -(1 << 62)
+# 衰减量化级数：权重降到 1/255 以下（约 5.5 个时间常数）即视为完全褪去
+SURFACE_LEVELS = 128
+SURFACE_HORIZON = np.log(255.0)
+
+# 对数强度模型：阈值滑块每一档对应的对数对比度（默认 20 档 → 0.2）
+LOG_THRESHOLD_UNIT = 0.01
+# lin-log 映射的拐点：低于该灰度时按线性延伸，避免暗部噪声在对数域被放大
+LIN_LOG_KNEE = 20
+
+
+def lin_log_table():
+    """灰度 0..255 → lin-log 强度的查找表（float32，供 cv2.LUT 使用）"""
+    x = np.arange(256, dtype=np.float64)
+    table = np.where(x < LIN_LOG_KNEE, x * np.log(LIN_LOG_KNEE) / LIN_LOG_KNEE,
+                     np.log(np.maximum(x, LIN_LOG_KNEE)))
+    return table.astype(np.float32)
 
 class EventGenerator:
-    def __init__(self):
+    def __init__(self, event_buffer=None, roi=None, binning=1, reuse_buffers=False, workers=1, rgb=False,
+                 time_surface=False, windows=None, log_intensity=False, event_filter=None,
+                 rate_controller=None):
+        """
+        event_buffer: 事件存储，需提供 extend()；默认为可增长的 EventBuffer，
+                      长时间实时采集时可传入 EventRingBuffer 以限制内存
+        roi:          (x, y, w, h)，只处理输入帧中的该区域；None 表示整帧
+        binning:      整数降采样因子，b×b 像素取均值合并为一个像素
+        reuse_buffers: 预分配模式——差分/掩码/事件图/参考帧缓冲在首帧分配后反复复用，
+                      稳态下每帧只分配返回的事件批次；返回的事件图为双缓冲，
+                      在下下次调用 generate 之前有效
+        workers:      >1 时启用分块模式：帧按行切成 workers 条带，由常驻线程池并行处理
+                      （NumPy / OpenCV 运算期间释放 GIL），按条带顺序合并，输出与单线程完全一致
+        rgb:          事件图按 RGB 通道顺序输出（可直接交给 Qt 显示）；bg_color 仍按 BGR 给出
+        time_surface: 维护每像素最近事件的时间戳与极性（每帧只更新触发事件的像素），
+                      由 render_time_surface() 按需渲染为指数衰减的拖影图
+        windows:      EventWindowAccumulator（见 event_window.py），每帧的事件同时送入，
+                      按固定时间窗产出计数帧 / 体素网格；输出尺寸变化时自动重置
+        log_intensity: 对数强度参考模型（DVS 像素模型）：每个像素记忆一个 lin-log 参考电平，
+                      变化 |Δ| 时发出 floor(|Δ|/C) 个事件（C = threshold × LOG_THRESHOLD_UNIT），
+                      参考电平随之前进 n·C 保留余量；各事件时间戳在上一帧与本帧的采集时间之间
+                      按线性插值求出，批次按时间排序。关闭时为原有的相邻帧灰度差分、每像素至多一个事件
+        event_filter: 噪声滤波器（如 event_filter.BackgroundActivityFilter），提供 keep_mask()/reset()；
+                      每批事件在写入 event_buffer、时间面与时间窗之前先经过滤波，事件图同步去掉被滤除的点
+        rate_controller: 事件率上限控制器（rate_controller.ThresholdController）；每帧按其给出的
+                      倍率（全局或分块）提高 generate 的 threshold，并用滤波后的输出事件更新事件率
+
+        输入帧可为任意分辨率；事件坐标与事件图均位于输出网格（裁剪、合并之后）上
+        """
         self.prev_gray = None
-        self.event_buffer = []
+        self.event_buffer = EventBuffer() if event_buffer is None else event_buffer
+        self.roi = roi
+        self.binning = max(1, int(binning))
+        self.reuse_buffers = reuse_buffers
+        self.rgb = rgb
+        self._bufs = None
+        self._lut = None
+        self._lut_bg = None
+        self.time_surface = time_surface
+        self.windows = windows
+        self.log_intensity = log_intensity
+        self.event_filter = event_filter
+        self.rate_controller = rate_controller
+        self._log_lut = lin_log_table() if log_intensity else None
+        self._ref_log = None
+        self._prev_ts = None
+        self._surface = None
+        self._surface_bufs = None
+        self._surface_lut = None
+        self._surface_lut_key = None
+        self.workers = max(1, int(workers))
+        self._pool = ThreadPoolExecutor(max_workers=self.workers) if self.workers > 1 else None
 
-    def generate(self, gray, threshold=15, decay=10,
-                 polarity_pos=True, polarity_neg=True,
-                 bg_color=(255, 255, 255)):
+    def close(self):
+        """关闭分块模式的线程池"""
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+            self._pool = None
 
-        assert gray.shape == (720, 1280), f"灰度图尺寸应为 1280×720，实际为 {gray.shape[::-1]}"
+    @property
+    def shape(self):
+        """最近一帧输出网格的 (height, width)，尚未处理任何帧时为 None"""
+        return None if self.prev_gray is None else self.prev_gray.shape
 
-        h, w = gray.shape
-        bg = np.array(bg_color, dtype=np.uint8)
-        event_img = np.full((h, w, 3), bg, dtype=np.uint8)
+    def output_size(self, width, height):
+        """输入分辨率 (width, height) 对应的输出网格尺寸 (width, height)"""
+        if self.roi is not None:
+            x, y, w, h = self.roi
+            width, height = max(0, min(w, width - x)), max(0, min(h, height - y))
+        return width // self.binning, height // self.binning
+
+    def _prepare(self, gray):
+        # ROI 裁剪（视图，不复制）+ 整数合并（INTER_AREA 在整数倍时即为块均值）
+        if self.roi is not None:
+            x, y, w, h = self.roi
+            gray = gray[y:y + h, x:x + w]
+        b = self.binning
+        if gray.shape[0] < b or gray.shape[1] < b:
+            raise ValueError(f"ROI {self.roi} 裁剪后的区域 {gray.shape[::-1]} 小于合并因子 {b}")
+        if b > 1:
+            h, w = gray.shape[0] // b, gray.shape[1] // b
+            dst = None
+            if self.reuse_buffers and self._bufs is not None and self._bufs['binned'].shape == (h, w):
+                dst = self._bufs['binned']
+            gray = cv2.resize(gray[:h * b, :w * b], (w, h), dst=dst, interpolation=cv2.INTER_AREA)
+        return gray
+
+    def _alloc(self, shape):
+        # 参考帧与事件图只在预分配模式下需要双缓冲；差分 / 对数电平缓冲只为所用的模型分配
+        h, w = shape
+        n = 2 if self.reuse_buffers else 1
+        log = self.log_intensity
+        return {
+            'ref':    [np.empty((h, w), np.uint8) for _ in range(n)],
+            'diff':   None if log else np.empty((h, w), np.int16),
+            'pos':    np.empty((h, w), bool),
+            'neg':    np.empty((h, w), bool),
+            'code':   np.empty((h, w), np.uint8),
+            'code3':  np.empty((h, w, 3), np.uint8),
+            'canvas': [np.empty((h, w, 3), np.uint8) for _ in range(n)],
+            'binned': np.empty((h, w), np.uint8) if self.reuse_buffers and self.binning > 1 else None,
+            'log':    np.empty((h, w), np.float32) if log else None,
+            'delta':  np.empty((h, w), np.float32) if log else None,
+        }
+
+    def _buffers(self, shape):
+        # 预分配模式下复用同一组缓冲；否则每帧新建（与原有行为一致）
+        if not self.reuse_buffers:
+            return self._alloc(shape)
+        if self._bufs is None or self._bufs['pos'].shape != shape:
+            self._bufs = self._alloc(shape)
+        return self._bufs
 
-        if self.prev_gray is None:
-            self.prev_gray = gray.copy()
-            return [], event_img
+    def _color_lut(self, bg_color):
+        # cv2.LUT 用的 256 项三通道表：0 → 背景，1 → 红点（正极性），2 → 蓝点（负极性）
+        if self._lut is None or self._lut_bg != tuple(bg_color):
+            self._lut = np.zeros((256, 1, 3), dtype=np.uint8)
+            self._lut[:4, 0] = [bg_color, (0, 0, 255), (255, 0, 0), (255, 0, 0)]
+            if self.rgb:
+                self._lut = np.ascontiguousarray(self._lut[:, :, ::-1])
+            self._lut_bg = tuple(bg_color)
+        return self._lut
 
-        # 计算差分
-        diff = gray.astype(np.int16) - self.prev_gray.astype(np.int16)
-        timestamp = time.time()
+    def _set_reference(self, bufs, gray):
+        # 双缓冲参考帧：写入空闲的一块后交换，不新建数组
+        spare = bufs['ref'][-1] if self.prev_gray is bufs['ref'][0] else bufs['ref'][0]
+        np.copyto(spare, gray)
+        self.prev_gray = spare
+
+    def _next_canvas(self, bufs):
+        canvas = bufs['canvas'][0]
+        bufs['canvas'].reverse()
+        return canvas
+
+    def _process_rows(self, y0, y1, bufs, gray, threshold, polarity_pos, polarity_neg, lut, event_img):
+        """处理 [y0, y1) 行：差分、阈值、绘制，返回正/负事件在整帧中的一维下标"""
+        rows = slice(y0, y1)
+
+        # 计算差分（就地写入 int16 缓冲）
+        diff = np.subtract(gray[rows], self.prev_gray[rows], out=bufs['diff'][rows], dtype=np.int16)
+        if not np.isscalar(threshold):
+            threshold = threshold[rows]
 
         # 矢量化：生成正/负掩码
-        pos_mask = (diff > threshold) if polarity_pos else np.zeros_like(diff, dtype=bool)
-        neg_mask = (diff < -threshold) if polarity_neg else np.zeros_like(diff, dtype=bool)
+        pos_mask, neg_mask = bufs['pos'][rows], bufs['neg'][rows]
+        if polarity_pos:
+            np.greater(diff, threshold, out=pos_mask)
+        else:
+            pos_mask.fill(False)
+        if polarity_neg:
+            np.less(diff, -threshold, out=neg_mask)
+        else:
+            neg_mask.fill(False)
+
+        return self._paint_rows(y0, rows, bufs, pos_mask, neg_mask, lut, event_img)
+
+    def _process_rows_log(self, y0, y1, bufs, gray, contrast, polarity_pos, polarity_neg, lut, event_img):
+        """对数强度模型下处理 [y0, y1) 行：与参考电平比较，返回越过 ±C 的像素下标（不修改参考电平）"""
+        rows = slice(y0, y1)
+        pos_mask, neg_mask = self._log_masks(rows, bufs, gray, contrast, polarity_pos, polarity_neg)
+        return self._paint_rows(y0, rows, bufs, pos_mask, neg_mask, lut, event_img)
+
+    def _log_masks(self, rows, bufs, gray, contrast, polarity_pos, polarity_neg):
+        # 对数电平与参考电平之差越过 ±C 的正 / 负掩码
+        log_img = cv2.LUT(gray[rows], self._log_lut, dst=bufs['log'][rows])
+        delta = np.subtract(log_img, self._ref_log[rows], out=bufs['delta'][rows])
+        if np.ndim(contrast):
+            contrast = contrast[rows]
+
+        pos_mask, neg_mask = bufs['pos'][rows], bufs['neg'][rows]
+        if polarity_pos:
+            np.greater_equal(delta, contrast, out=pos_mask)
+        else:
+            pos_mask.fill(False)
+        if polarity_neg:
+            np.less_equal(delta, -contrast, out=neg_mask)
+        else:
+            neg_mask.fill(False)
+        return pos_mask, neg_mask
+
+    def _paint_rows(self, y0, rows, bufs, pos_mask, neg_mask, lut, event_img):
+        # 绘制事件像素：按 (正, 负) 掩码组合查表，整帧一次完成
+        # （cv2.LUT 直接写入画布；np.take 会为索引另建一份 intp 整帧数组）
+        code = np.left_shift(neg_mask.view(np.uint8), 1, out=bufs['code'][rows])
+        np.bitwise_or(code, pos_mask.view(np.uint8), out=code)
+        cv2.cvtColor(code, cv2.COLOR_GRAY2BGR, dst=bufs['code3'][rows])
+        cv2.LUT(bufs['code3'][rows], lut, dst=event_img[rows])
+
+        # 提取事件下标（一维 flatnonzero 比二维 nonzero 快一个量级）
+        offset = y0 * pos_mask.shape[1]
+        return np.flatnonzero(pos_mask) + offset, np.flatnonzero(neg_mask) + offset
+
+    def _log_update(self, gray, flat_pos, flat_neg, contrast):
+        """
+        对数强度模型的参考电平更新：触发像素的参考电平前进 n = floor(|Δ|/C) 个 C（保留余量）
+        返回按像素（长度为触发像素数）的 (下标, 极性, 本帧电平, 原参考电平, n, C)
+        """
+        idx = np.concatenate([flat_pos, flat_neg])
+        sign = np.ones(len(idx), dtype=np.float32)
+        sign[len(flat_pos):] = -1
+        l_cur = self._log_lut[gray.ravel()[idx]]
+        ref = self._ref_log.ravel()
+        ref_old = ref[idx]
+
+        if np.ndim(contrast):
+            contrast = contrast.ravel()[idx]
+        counts = np.floor(np.abs(l_cur - ref_old) / contrast).astype(np.int64)
+        ref[idx] = ref_old + sign * counts * contrast
+        return idx, sign, l_cur, ref_old, counts, contrast
+
+    def _log_events(self, gray, flat_pos, flat_neg, contrast, timestamp):
+        """
+        对数强度模型的事件批次：每个触发像素发出 n = floor(|Δ|/C) 个事件，
+        第 k 个事件在强度线性插值越过 参考电平 ± k·C 的时刻，参考电平前进 n·C
+        全部为按事件数的向量运算（repeat / cumsum），无 Python 循环
+        """
+        idx, sign, l_cur, ref_old, counts, contrast = self._log_update(gray, flat_pos, flat_neg, contrast)
+        l_prev = self._log_lut[self.prev_gray.ravel()[idx]]
 
-        # 绘制事件像素
-        event_img[pos_mask] = [0, 0, 255]    # 红点：正极性
-        event_img[neg_mask] = [255, 0, 0]    # 蓝点：负极性
+        # 第 k 个电平 ref_old ± k·C 在两帧间的越过比例 s = a + k·b（强度按线性插值）
+        span = l_cur - l_prev
+        span[span == 0] = np.inf
+        a = (ref_old - l_prev) / span
+        b = sign * np.float32(contrast) / span
 
-        # 提取所有事件坐标
-        y_pos, x_pos = np.where(pos_mask)
-        y_neg, x_neg = np.where(neg_mask)
+        # 展开到事件：每个像素重复 n 次，k = 1..n 为该像素内的序号
+        total = int(counts.sum())
+        owner = np.repeat(np.arange(len(idx)), counts)
+        k = np.arange(1, total + 1, dtype=np.float32)
+        k -= np.repeat((np.cumsum(counts) - counts).astype(np.float32), counts)
+        s = a[owner] + k * b[owner]
+        np.clip(s, 0.0, 1.0, out=s)
 
-        # 构建事件列表
-        events_pos = list(zip(x_pos, y_pos, [timestamp]*len(x_pos), [1]*len(x_pos)))
-        events_neg = list(zip(x_neg, y_neg, [timestamp]*len(x_neg), [-1]*len(x_neg)))
-        events = events_pos + events_neg
+        t_prev = self._prev_ts if self._prev_ts is not None and self._prev_ts <= timestamp else timestamp
+        dt = timestamp - t_prev
+        offsets = np.rint(s * dt)
+        # 按时间稳定排序；帧间隔不超过 65.535 ms 时用 16 位偏移，NumPy 走基数排序（线性时间）
+        offsets = offsets.astype(np.uint16 if dt < (1 << 16) else np.int64)
+        order = np.argsort(offsets, kind='stable')
+
+        owner = owner[order]
+        y, x = np.divmod(idx, gray.shape[1])
+        events = np.empty(total, dtype=EVENT_DTYPE)
+        events['x'] = x[owner]
+        events['y'] = y[owner]
+        events['t'] = offsets[order]
+        events['t'] += t_prev
+        events['p'] = sign[owner]
+        return events
+
+    def generate(self, gray, threshold=15, decay=10,
+                 polarity_pos=True, polarity_neg=True,
+                 bg_color=(255, 255, 255), timestamp=None):
+        """
+        timestamp: 该帧的采集时间（微秒）；None 时使用处理时刻的系统时间
+        返回的事件图为本帧的单帧快照；decay 不影响它，带拖影的显示见 render_time_surface()
+        """
+
+        gray = self._prepare(gray)
+        bufs = self._buffers(gray.shape)
+        lut = self._color_lut(bg_color)
+        event_img = self._next_canvas(bufs)
+
+        if timestamp is None:
+            timestamp = int(time.time() * 1e6)  # 微秒
+
+        # 首帧或输入尺寸变化时重新建立参考帧
+        if self.prev_gray is None or self.prev_gray.shape != gray.shape:
+            self._set_reference(bufs, gray)
+            if self.log_intensity:
+                self._ref_log = cv2.LUT(gray, self._log_lut)
+                self._prev_ts = timestamp
+            if self.time_surface:
+                self._reset_surface(gray.shape)
+            if self.windows is not None:
+                self.windows.reset(gray.shape[1], gray.shape[0])
+            if self.event_filter is not None:
+                self.event_filter.reset(gray.shape[1], gray.shape[0])
+            event_img[...] = lut[0, 0]
+            return empty_events(), event_img
+
+        h, w = gray.shape
+        # 阈值可为标量，或（分块速率控制时）与输出网格同尺寸的逐像素阈值图
+        if self.rate_controller is not None:
+            threshold = self.rate_controller.threshold(threshold, gray.shape)
+        if self.log_intensity:
+            process = self._process_rows_log
+            threshold = np.maximum(threshold, 1) * np.float32(LOG_THRESHOLD_UNIT)
+        else:
+            process = self._process_rows
+            threshold = (int(round(threshold)) if np.isscalar(threshold)
+                         else np.rint(threshold).astype(np.int16))
+        args = (bufs, gray, threshold, polarity_pos, polarity_neg, lut, event_img)
+        if self._pool is None:
+            flat_pos, flat_neg = process(0, h, *args)
+        else:
+            # 分块模式：各条带结果按行序拼接（正极性整体在前），与单线程输出逐元素一致
+            bounds = np.linspace(0, h, min(self.workers, h) + 1).astype(int)
+            parts = list(self._pool.map(lambda r: process(r[0], r[1], *args),
+                                        zip(bounds[:-1], bounds[1:])))
+            flat_pos = np.concatenate([p for p, _ in parts])
+            flat_neg = np.concatenate([n for _, n in parts])
+
+        if self.log_intensity:
+            events = self._log_events(gray, flat_pos, flat_neg, threshold, timestamp)
+            self._prev_ts = timestamp
+        else:
+            events = self._diff_events(flat_pos, flat_neg, w, timestamp)
+
+        if self.event_filter is not None and len(events):
+            keep = self.event_filter.keep_mask(events)
+            if not keep.all():
+                self._erase_events(event_img, events[~keep], events[keep], lut, w)
+                events = events[keep]
+
+        if self.rate_controller is not None:
+            self.rate_controller.update(events, timestamp, gray.shape)
 
         # 更新状态
-        self.prev_gray = gray.copy()
+        self._set_reference(bufs, gray)
+        if self.time_surface:
+            self._update_surface(events, w)
         self.event_buffer.extend(events)
+        if self.windows is not None:
+            self.windows.extend(events)
 
         return events, event_img
+
+    def advance(self, gray, threshold=15, polarity_pos=True, polarity_neg=True, timestamp=None):
+        """
+        只推进参考状态（参考帧；对数模型下还有带余量的参考电平与上一帧时间戳），不产生事件、不绘制事件图
+        之后的参考状态与以相同参数调用 generate 逐位一致，用于从中途开始转换时重放之前的帧（见 main2.py）
+        噪声滤波、速率控制、时间面与时间窗不参与
+        """
+        if timestamp is None:
+            timestamp = int(time.time() * 1e6)  # 微秒
+        prepared = self._prepare(gray)
+        if self.prev_gray is None or self.prev_gray.shape != prepared.shape:
+            # 首帧：与 generate 相同地建立参考帧（不产生事件）
+            self.generate(gray, timestamp=timestamp)
+            return
+        gray = prepared
+        bufs = self._buffers(gray.shape)
+        if self.log_intensity:
+            contrast = np.maximum(threshold, 1) * np.float32(LOG_THRESHOLD_UNIT)
+            pos_mask, neg_mask = self._log_masks(slice(None), bufs, gray, contrast, polarity_pos, polarity_neg)
+            self._log_update(gray, np.flatnonzero(pos_mask), np.flatnonzero(neg_mask), contrast)
+            self._prev_ts = timestamp
+        self._set_reference(bufs, gray)
+
+    def _erase_events(self, event_img, removed, kept, lut, w):
+        # 被滤除的像素恢复为背景，再重画保留的事件（同一像素可能既有被滤除的也有保留的事件）
+        canvas = event_img.reshape(-1, 3)
+        canvas[removed['y'].astype(np.int64) * w + removed['x']] = lut[0, 0]
+        canvas[kept['y'].astype(np.int64) * w + kept['x']] = lut[np.where(kept['p'] > 0, 1, 2), 0]
+
+    def _diff_events(self, flat_pos, flat_neg, w, timestamp):
+        # 拆分行列坐标
+        y_pos, x_pos = np.divmod(flat_pos, w)
+        y_neg, x_neg = np.divmod(flat_neg, w)
+
+        # 构建列式事件批次（正极性在前，负极性在后）
+        n_pos = len(x_pos)
+        events = np.empty(n_pos + len(x_neg), dtype=EVENT_DTYPE)
+        events['x'][:n_pos] = x_pos
+        events['x'][n_pos:] = x_neg
+        events['y'][:n_pos] = y_pos
+        events['y'][n_pos:] = y_neg
+        events['t'] = timestamp
+        events['p'][:n_pos] = 1
+        events['p'][n_pos:] = -1
+        return events
+
+    def _reset_surface(self, shape):
+        # (时间戳, 极性) 作为一个元组整体替换，渲染线程不会拿到尺寸不一致的两块数组
+        self._surface = (np.full(shape, SURFACE_EMPTY, dtype=np.int64), np.zeros(shape, dtype=np.uint8))
+
+    def _update_surface(self, events, w):
+        # 只写入本帧触发的像素，代价与事件数成正比；批次按时间有序，同一像素以最后（最新）一个事件为准
+        # 极性以 LUT 下标的高位记录（0 正，128 负）
+        surface_t, surface_p = self._surface
+        pix = events['y'].astype(np.int64) * w + events['x']
+        surface_t.flat[pix] = events['t']
+        surface_p.flat[pix] = np.where(events['p'] < 0, SURFACE_LEVELS, 0)
+
+    def _surface_color_lut(self, bg_color):
+        # 下标 = 衰减级 q (0..127) | 极性位；颜色 = 背景与事件色按 exp(-age/τ) 混合
+        key = (tuple(bg_color), self.rgb)
+        if self._surface_lut is None or self._surface_lut_key != key:
+            weight = np.exp(-np.arange(SURFACE_LEVELS) * SURFACE_HORIZON / (SURFACE_LEVELS - 1))
+            weight[-1] = 0.0
+            bg = np.array(bg_color, dtype=np.float64)
+            lut = np.zeros((256, 3), dtype=np.uint8)
+            for base, color in ((0, (0, 0, 255)), (SURFACE_LEVELS, (255, 0, 0))):
+                mixed = bg + weight[:, None] * (np.array(color) - bg)
+                lut[base:base + SURFACE_LEVELS] = np.round(mixed)
+            if self.rgb:
+                lut = lut[:, ::-1]
+            # 按通道拆成三张单通道表：三次单通道 LUT + merge 比三通道 LUT 快
+            self._surface_lut = [np.ascontiguousarray(lut[:, c]) for c in range(3)]
+            self._surface_lut_key = key
+        return self._surface_lut
+
+    def render_time_surface(self, decay=10, bg_color=(255, 255, 255), now=None):
+        """
+        把时间面渲染为指数衰减图：每个像素按其最近事件的极性着色，
+        亮度随 exp(-(now - t) / τ) 褪向背景，τ = decay × DECAY_UNIT_US
+
+        每次渲染为 O(像素数) 的整帧向量运算，与历史事件数无关，只在需要显示时调用即可。
+        now: 渲染时刻（微秒），默认取最近一个事件的时间戳（尚无事件时整幅为背景）
+        返回的图像缓冲在下次调用时复用；尚无时间面时返回 None
+        """
+        if self._surface is None:
+            return None
+        surface_t, surface_p = self._surface
+        if now is None:
+            # 尚无任何事件时取 0：所有像素的年龄都超出视界，渲染为背景
+            latest = int(surface_t.max())
+            now = latest if latest != SURFACE_EMPTY else 0
+        shape = surface_t.shape
+        bufs = self._surface_bufs
+        if bufs is None or bufs['age'].shape != shape:
+            bufs = self._surface_bufs = {
+                'age':   np.empty(shape, np.float32),
+                'level': np.empty(shape, np.uint8),
+                'chans': [np.empty(shape, np.uint8) for _ in range(3)],
+                'img':   np.empty(shape + (3,), np.uint8),
+            }
+
+        # 年龄 → 衰减级：年龄先截断到视界，超出视界的（含从未触发的）像素落在最后一级，即背景色
+        tau = max(1, decay) * DECAY_UNIT_US
+        age = np.subtract(now, surface_t, out=bufs['age'], casting='unsafe')
+        np.minimum(age, SURFACE_HORIZON * tau, out=age)
+        level = cv2.convertScaleAbs(age, dst=bufs['level'],
+                                    alpha=(SURFACE_LEVELS - 1) / (SURFACE_HORIZON * tau))
+        np.bitwise_or(level, surface_p, out=level)
+
+        luts = self._surface_color_lut(bg_color)
+        for lut, chan in zip(luts, bufs['chans']):
+            cv2.LUT(level, lut, dst=chan)
+        return cv2.merge(bufs['chans'], dst=bufs['img'])
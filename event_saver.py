@@ -1,21 +1,163 @@
 # event_saver.py
+import os
 import numpy as np
-import csv
 import time
+import zipfile
+
+from event_buffer import as_event_array
+from event_codec import encode_events, decode_events
+from event_file import EventFileWriter
+from event_window import count_windows, iter_event_windows
+
+# 所有保存函数均支持：
+#   progress(done, total)  每写完一块回调一次
+#   cancel                 threading.Event，置位后尽快停止并删除未写完的文件，返回 False
+CHUNK_SIZE = 1 << 18
+
+_CSV_ROW = '%d,%d,%d,%d\r\n'
+
+
+def _cancelled(cancel):
+    return cancel is not None and cancel.is_set()
+
+
+def _abort(path):
+    if os.path.exists(path):
+        os.remove(path)
+    return False
+
+
+def _format_csv_block(block):
+    # 整块格式化：四列交错成一维后用一次 % 运算生成全部行
+    cols = np.empty((len(block), 4), dtype=np.int64)
+    cols[:, 0] = block['x']
+    cols[:, 1] = block['y']
+    cols[:, 2] = block['t']
+    cols[:, 3] = block['p']
+    return (_CSV_ROW * len(block)) % tuple(cols.ravel().tolist())
+
+
+def save_event_csv(events, path, chunk_size=CHUNK_SIZE, progress=None, cancel=None):
+    events = as_event_array(events)
+    n = len(events)
+    with open(path, 'w', newline='', buffering=1 << 20) as f:
+        f.write('x,y,timestamp,polarity\r\n')
+        for i in range(0, n, chunk_size):
+            if _cancelled(cancel):
+                break
+            f.write(_format_csv_block(events[i:i + chunk_size]))
+            if progress is not None:
+                progress(min(i + chunk_size, n), n)
+    if _cancelled(cancel):
+        return _abort(path)
+    return True
+
+
+def save_event_npz(events, path, chunk_size=CHUNK_SIZE, progress=None, cancel=None):
+    """
+    与 np.savez_compressed 输出一致（x/y/t/p 四个数组），但按块写入各列，
+    既能报告进度，也不会为内存映射的大记录整列复制
+    """
+    events = as_event_array(events)
+    n = len(events)
+    total = 4 * n
+    done = 0
+    with zipfile.ZipFile(path, 'w', compression=zipfile.ZIP_DEFLATED, allowZip64=True) as zf:
+        for name in ('x', 'y', 't', 'p'):
+            col = events[name]
+            header = np.lib.format.header_data_from_array_1_0(np.empty(0, dtype=col.dtype))
+            header['shape'] = (n,)
+            with zf.open(name + '.npy', 'w', force_zip64=True) as f:
+                np.lib.format.write_array_header_1_0(f, header)
+                for i in range(0, n, chunk_size):
+                    if _cancelled(cancel):
+                        break
+                    f.write(np.ascontiguousarray(col[i:i + chunk_size]).tobytes())
+                    done += min(chunk_size, n - i)
+                    if progress is not None:
+                        progress(done, total)
+            if _cancelled(cancel):
+                break
+    if _cancelled(cancel):
+        return _abort(path)
+    return True
+
+
+def save_event_windows(events, path, window_us, width, height, bins=5, progress=None, cancel=None):
+    """
+    按固定时间窗把事件记录转换为模型输入张量，保存为 .npz：
+      t0:     (N,) int64，各时间窗起点（微秒）
+      counts: (N, 2, H, W) int32，正/负极性事件计数帧
+      voxel:  (N, bins, H, W) float32，体素网格（bins 为 0 时不保存）
+    逐个时间窗流式写入，内存只占一个时间窗；计数与体素分两遍顺序写出
+    """
+    events = as_event_array(events)
+    n = count_windows(events, window_us)
+    fields = ['counts', 'voxel'] if bins else ['counts']
+    total = n * len(fields)
+    done = 0
+    with zipfile.ZipFile(path, 'w', compression=zipfile.ZIP_DEFLATED, allowZip64=True) as zf:
+        t0 = np.empty(n, dtype=np.int64)
+        if n:
+            t0[:] = (np.arange(n) + int(events['t'][0]) // window_us) * window_us
+        with zf.open('t0.npy', 'w', force_zip64=True) as f:
+            np.lib.format.write_array(f, t0)
+        for name in fields:
+            shape = (2 if name == 'counts' else bins, height, width)
+            dtype = np.int32 if name == 'counts' else np.float32
+            header = np.lib.format.header_data_from_array_1_0(np.empty((0,) + shape, dtype=dtype))
+            header['shape'] = (n,) + shape
+            with zf.open(name + '.npy', 'w', force_zip64=True) as f:
+                np.lib.format.write_array_header_1_0(f, header)
+                for window in iter_event_windows(events, window_us, width, height,
+                                                 bins=bins if name == 'voxel' else 0):
+                    if _cancelled(cancel):
+                        break
+                    f.write(getattr(window, name).tobytes())
+                    done += 1
+                    if progress is not None:
+                        progress(done, total)
+            if _cancelled(cancel):
+                break
+    if _cancelled(cancel):
+        return _abort(path)
+    return True
+
+
+def save_event_file(events, path, width=0, height=0, chunk_size=1 << 20, progress=None, cancel=None):
+    """保存为带时间索引的 .evt 记录（见 event_file.py），逐块写出"""
+    events = as_event_array(events)
+    n = len(events)
+    with EventFileWriter(path, width=width, height=height) as writer:
+        for i in range(0, n, chunk_size):
+            if _cancelled(cancel):
+                break
+            writer.append(events[i:i + chunk_size])
+            if progress is not None:
+                progress(min(i + chunk_size, n), n)
+    if _cancelled(cancel):
+        return _abort(path)
+    return True
+
+
+def save_event_packed(events, path, progress=None, cancel=None):
+    """保存为位压缩格式（约 6 字节/事件，见 event_codec.py）"""
+    events = as_event_array(events)
+    encoded = encode_events(events)
+    if _cancelled(cancel):
+        return False
+    # 传入文件对象，避免 np.savez 自动追加 .npz 扩展名
+    with open(path, 'wb') as f:
+        np.savez(f, **encoded)
+    if progress is not None:
+        progress(len(events), len(events))
+    return True
+
+
+def load_event_packed(path):
+    with np.load(path) as data:
+        return decode_events(data['words'], data['dt'], data['chunk_base'], data['chunk_len'])
 
-def save_event_csv(event_list, path):
-    with open(path, 'w', newline='') as f:
-        writer = csv.writer(f)
-        writer.writerow(['x', 'y', 'timestamp', 'polarity'])
-        for event in event_list:
-            writer.writerow(event)
-
-def save_event_npz(event_list, path):
-    x = np.array([e[0] for e in event_list])
-    y = np.array([e[1] for e in event_list])
-    t = np.array([e[2] for e in event_list])
-    p = np.array([e[3] for e in event_list])
-    np.savez_compressed(path, x=x, y=y, t=t, p=p)
 
 def generate_timestamp_filename(prefix, ext):
     ts = time.strftime("%Y%m%d_%H%M%S")
@@ -0,0 +1,150 @@
+# 文件：event_window.py
+from collections import namedtuple
+import numpy as np
+
+from event_buffer import as_event_array
+
+# 一个时间窗 [t0, t1) 的累积结果：
+#   counts: (2, H, W) int32，第 0 通道为正极性事件数，第 1 通道为负极性事件数
+#   voxel:  (bins, H, W) float32 体素网格；bins 为 0 时为 None
+EventWindow = namedtuple('EventWindow', 't0 t1 n_events counts voxel')
+
+
+def accumulate_window(events, t0, window_us, counts, voxel=None):
+    """
+    把一批落在 [t0, t0 + window_us) 内的事件就地累加进计数帧与体素网格
+
+    均为整批 bincount 散射，无逐事件循环。体素网格按时间双线性插值：
+    归一化时间 τ = (bins-1)·(t-t0)/window_us，事件的极性 p 按 1-|b-τ| 分给相邻两个时间片 b
+    """
+    _, height, width = counts.shape
+    hw = height * width
+    pix = events['y'].astype(np.int64) * width + events['x']
+    neg = events['p'] < 0
+    counts += np.bincount(pix + neg * hw, minlength=2 * hw).reshape(counts.shape)
+    if voxel is None:
+        return
+    bins = len(voxel)
+    tn = (events['t'] - t0) * ((bins - 1) / window_us)
+    np.clip(tn, 0, bins - 1, out=tn)
+    b0 = tn.astype(np.int64)
+    frac = tn - b0
+    pol = np.where(neg, -1.0, 1.0)
+    idx = b0 * hw + pix
+    flat = np.bincount(idx, weights=pol * (1 - frac), minlength=bins * hw)
+    # 落在最后一片上的事件 frac 恒为 0，多出的一片直接丢掉
+    flat += np.bincount(idx + hw, weights=pol * frac, minlength=(bins + 1) * hw)[:bins * hw]
+    voxel += flat.reshape(voxel.shape)
+
+
+class EventWindowAccumulator:
+    """
+    流式时间窗累积器：按事件时间戳把事件切进固定长度的时间窗（对齐到 window_us 的整数倍），
+    每个时间窗结束时产出一个 EventWindow（计数帧 + 体素网格）
+
+    接口与事件存储一致（extend），可直接作为事件的下游；事件需按时间戳单调不减送入。
+    window_us:  时间窗长度（微秒）
+    width/height: 输出网格尺寸，也可之后用 reset() 设置
+    bins:       体素网格的时间片数，0 表示只产出计数帧
+    skip_empty: 不产出没有事件的时间窗；默认产出，保证输出为固定帧率
+    on_window:  每产出一个时间窗调用一次 on_window(window)
+    """
+    def __init__(self, window_us, width=0, height=0, bins=0, skip_empty=False, on_window=None):
+        self.window_us = int(window_us)
+        self.bins = int(bins)
+        self.skip_empty = skip_empty
+        self.on_window = on_window
+        self._next_window_us = None
+        self.reset(width, height)
+
+    def reset(self, width, height):
+        """设置输出尺寸并丢弃未完成的时间窗"""
+        self.width, self.height = int(width), int(height)
+        self._t0 = None
+        self._counts = None
+        self._voxel = None
+        self._n = 0
+
+    def set_window(self, window_us):
+        """修改时间窗长度，从下一个时间窗开始生效"""
+        window_us = int(window_us)
+        if self._t0 is None:
+            self.window_us, self._next_window_us = window_us, None
+        else:
+            self._next_window_us = window_us if window_us != self.window_us else None
+
+    def _open(self, t0):
+        self._t0 = t0
+        self._counts = np.zeros((2, self.height, self.width), dtype=np.int32)
+        self._voxel = np.zeros((self.bins, self.height, self.width), dtype=np.float32) if self.bins else None
+        self._n = 0
+
+    def _close(self):
+        window = EventWindow(self._t0, self._t0 + self.window_us, self._n, self._counts, self._voxel)
+        if self.on_window is not None:
+            self.on_window(window)
+        return window
+
+    def _advance(self, t, done):
+        # 结束当前时间窗，（按需）补齐中间的空窗，在 t 所在的时间窗处重新开始
+        if self._n or not self.skip_empty:
+            done.append(self._close())
+        t0 = self._t0 + self.window_us
+        if self._next_window_us is not None:
+            self.window_us, self._next_window_us = self._next_window_us, None
+        skipped = (t - t0) // self.window_us
+        if not self.skip_empty:
+            for k in range(skipped):
+                self._open(t0 + k * self.window_us)
+                done.append(self._close())
+        self._open(t0 + skipped * self.window_us)
+
+    def extend(self, events):
+        """送入一批事件，返回本批中结束的时间窗列表"""
+        events = as_event_array(events)
+        done = []
+        if len(events) == 0:
+            return done
+        # 连续的时间戳副本：结构化数组的字段视图是跨步的，searchsorted 会为每次切片整段复制
+        t = np.ascontiguousarray(events['t'])
+        if self._t0 is None:
+            self._open(int(t[0]) // self.window_us * self.window_us)
+        i = 0
+        while i < len(events):
+            t1 = self._t0 + self.window_us
+            if t[i] >= t1:
+                self._advance(int(t[i]), done)
+                continue
+            # 本批中仍属于当前时间窗的部分（早于窗口起点的迟到事件并入当前窗）
+            j = i + int(np.searchsorted(t[i:], t1, side='left'))
+            accumulate_window(events[i:j], self._t0, self.window_us, self._counts, self._voxel)
+            self._n += j - i
+            i = j
+        return done
+
+    def flush(self):
+        """结束并返回当前未完成的时间窗（没有则返回空列表）"""
+        if self._t0 is None or (self.skip_empty and not self._n):
+            return []
+        window = self._close()
+        self._t0 = None
+        return [window]
+
+
+def count_windows(events, window_us):
+    """事件记录按 window_us 切分（不跳过空窗）得到的时间窗个数"""
+    if len(events) == 0:
+        return 0
+    t_first, t_last = int(events['t'][0]), int(events['t'][-1])
+    return t_last // window_us - t_first // window_us + 1
+
+
+def iter_event_windows(events, window_us, width, height, bins=0, skip_empty=False, chunk_size=1 << 20):
+    """
+    对已保存的事件记录（数组或 .evt 内存映射）逐块生成时间窗，内存只占一块事件加一个时间窗
+    """
+    events = as_event_array(events)
+    acc = EventWindowAccumulator(window_us, width, height, bins=bins, skip_empty=skip_empty)
+    for i in range(0, len(events), chunk_size):
+        yield from acc.extend(events[i:i + chunk_size])
+    yield from acc.flush()
@@ -1,11 +1,78 @@
 import cv2
 import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from natsort import natsorted  # pip install natsort
 
+from event_buffer import DiscardEvents
+from event_generator import EventGenerator
+from pipeline import Frame, generate_events, run, EventFileSink, EventVideoSink
+
+
+def list_images(image_folder: str, exts=('.bmp',)):
+    """
+    Return the image files in image_folder with one of the given extensions, in natural order.
+    """
+    files = natsorted(f for f in os.listdir(image_folder) if f.lower().endswith(exts))
+    if not files:
+        raise FileNotFoundError(f"No {'/'.join(e.lstrip('.').upper() for e in exts)} files found "
+                                f"in directory: {image_folder}")
+    return [os.path.join(image_folder, f) for f in files]
+
+
+def _load_image(path: str, size, flags: int):
+    img = cv2.imread(path, flags)
+    if img is not None and size is not None and img.shape[1::-1] != size:
+        img = cv2.resize(img, size, interpolation=cv2.INTER_AREA)
+    return img
+
+
+def iter_images(files, size=None, workers: int = 4, prefetch: int = 16, grayscale: bool = False):
+    """
+    Decode images on a thread pool ahead of the consumer, yielding (path, image) in list order.
+
+    :param files: Image paths, already in the desired order
+    :param size: (width, height) every image is resized to; None keeps each image's own size
+    :param workers: Decoder threads (cv2.imread releases the GIL)
+    :param prefetch: Maximum number of images decoded ahead of the consumer (bounds memory)
+    :param grayscale: Decode straight to single-channel grayscale
+    Unreadable files are reported and skipped.
+    """
+    flags = cv2.IMREAD_GRAYSCALE if grayscale else cv2.IMREAD_COLOR
+    paths = iter(files)
+    pending = deque()
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        def submit():
+            path = next(paths, None)
+            if path is not None:
+                pending.append((path, pool.submit(_load_image, path, size, flags)))
+
+        for _ in range(max(1, prefetch)):
+            submit()
+        while pending:
+            path, future = pending.popleft()
+            # Keep the window full: queue the next file before waiting on this one
+            submit()
+            img = future.result()
+            if img is None:
+                print(f"Warning: skipping unreadable file {path}")
+                continue
+            yield path, img
+
+
+def _frame_size(path: str):
+    frame = cv2.imread(path)
+    if frame is None:
+        raise IOError(f"Cannot read image: {path}")
+    return frame.shape[1::-1]
+
+
 def bmp_folder_to_video(image_folder: str,
                         output_path: str,
                         fps: int = 30,
-                        codec: str = 'mp4v'):
+                        codec: str = 'mp4v',
+                        workers: int = 4,
+                        prefetch: int = 16):
     """
     Assemble all BMP images in the specified folder into an MP4 video at 30 FPS.
 
@@ -13,33 +80,22 @@ def bmp_folder_to_video(image_folder: str,
     :param output_path: Path for the output .mp4 video file (e.g. output.mp4)
     :param fps: Frames per second (default: 30)
     :param codec: FourCC video codec (default 'mp4v' for MP4)
+    :param workers: Threads decoding images ahead of the encoder (1 = decode one at a time)
+    :param prefetch: Maximum number of decoded images waiting for the encoder
+    Images whose size differs from the first one are resized to it.
     """
     # 1. List all BMP files and sort them naturally
-    files = [f for f in os.listdir(image_folder) if f.lower().endswith('.bmp')]
-    files = natsorted(files)
-    if not files:
-        raise FileNotFoundError(f"No BMP files found in directory: {image_folder}")
+    files = list_images(image_folder)
 
     # 2. Read the first image to get frame size
-    first_img_path = os.path.join(image_folder, files[0])
-    frame = cv2.imread(first_img_path)
-    if frame is None:
-        raise IOError(f"Cannot read image: {first_img_path}")
-    height, width = frame.shape[:2]
+    width, height = _frame_size(files[0])
 
     # 3. Create VideoWriter for MP4
     fourcc = cv2.VideoWriter_fourcc(*codec)
     video_writer = cv2.VideoWriter(output_path, fourcc, fps, (width, height))
 
-    # 4. Write each frame
-    for fname in files:
-        img_path = os.path.join(image_folder, fname)
-        img = cv2.imread(img_path)
-        if img is None:
-            print(f"Warning: skipping unreadable file {img_path}")
-            continue
-        # If sizes differ, uncomment to resize:
-        # img = cv2.resize(img, (width, height))
+    # 4. Write each frame while the next ones are decoded in the background
+    for _, img in iter_images(files, (width, height), workers, prefetch):
         video_writer.write(img)
 
     # 5. Release resources
@@ -47,8 +103,55 @@ def bmp_folder_to_video(image_folder: str,
     print(f"Video successfully created: {output_path}")
 
 
+def bmp_folder_to_events(image_folder: str,
+                         evt_path: str,
+                         fps: float = 30,
+                         threshold: int = 15,
+                         video_path: str = None,
+                         bg_color=(255, 255, 255),
+                         workers: int = 4,
+                         prefetch: int = 16,
+                         **generator_options):
+    """
+    Convert a BMP sequence straight into an .evt event recording, without an intermediate
+    video encode/decode round-trip. Images are decoded directly to grayscale on a thread pool.
+
+    :param image_folder: Path to the folder containing BMP images
+    :param evt_path: Output .evt recording (see event_file.py)
+    :param fps: Frame rate of the sequence; frame k is timestamped k / fps seconds
+    :param threshold: Generator threshold
+    :param video_path: Optional event video (XVID) written alongside the events
+    :param bg_color: Event video background (BGR)
+    :param workers: Image decoder threads
+    :param prefetch: Maximum number of decoded images waiting for the generator
+    :param generator_options: Passed to EventGenerator (roi, binning, log_intensity, ...)
+    :return: (frames converted, events generated)
+    """
+    files = list_images(image_folder)
+    width, height = _frame_size(files[0])
+
+    generator = EventGenerator(event_buffer=DiscardEvents(), reuse_buffers=True, **generator_options)
+    out_w, out_h = generator.output_size(width, height)
+    evt = EventFileSink(evt_path, out_w, out_h)
+    sinks = [evt]
+    if video_path is not None:
+        sinks.append(EventVideoSink(video_path, fps, (out_w, out_h)))
+
+    images = iter_images(files, (width, height), workers, prefetch, grayscale=True)
+    frames = (Frame(k, None, gray) for k, (_, gray) in enumerate(images))
+    batches = generate_events(frames, generator, fps=fps, threshold=threshold, bg_color=bg_color)
+    try:
+        frames, _ = run(batches, *sinks)
+    finally:
+        generator.close()
+    print(f"Events successfully created: {evt_path} ({frames} frames, {len(evt)} events)")
+    return frames, len(evt)
+
+
 if __name__ == "__main__":
     # Example usage
     src_folder = r"C:\Users\18795\Desktop\image"
     out_video = r"C:\Users\18795\Desktop\output.mp4"
     bmp_folder_to_video(src_folder, out_video, fps=30, codec='mp4v')
+    # Or go straight from the images to events:
+    # bmp_folder_to_events(src_folder, r"C:\Users\18795\Desktop\events.evt", fps=30, threshold=15)
@@ -1,127 +1,294 @@
 # 文件：main.py
+import os
 import sys
 import time
+import tempfile
 import numpy as np
 import cv2
 import threading
-import queue
 import traceback
+from collections import namedtuple
 from PyQt5.QtWidgets import QApplication, QFileDialog, QMessageBox, QLabel
 from PyQt5.QtGui import QImage, QPixmap
 from PyQt5.QtCore import QTimer, pyqtSignal, QObject
 
 from ui_main import EventCameraUI
 from camera_stream import CameraStream
+from event_buffer import EventRingBuffer
 from event_generator import EventGenerator
-from event_saver import save_event_csv, save_event_npz
+from event_window import EventWindowAccumulator
+from event_filter import BackgroundActivityFilter
+from rate_controller import ThresholdController
+from stage_queue import StageQueue, DROP_OLDEST
+from pipeline import camera_frames, prefetch, generate_events, run, CallbackSink
+from metrics import Metrics, MetricsWriter, format_stages
+from event_saver import (save_event_csv, save_event_npz, save_event_file, save_event_packed,
+                         generate_timestamp_filename)
 from utils import get_background_canvas
 
+# 视频源：摄像头编号，或用于无摄像头测试的视频文件 / 图片目录路径
+CAMERA_SOURCE       = 0
+CAMERA_FORMAT       = dict(width=1280, height=720, fps=30, fourcc='MJPG', buffer_size=1)
+
+# 内存中保留的最近事件数（约 13 字节/事件），更早的事件由后台线程落盘
+EVENT_RING_CAPACITY = 1 << 22
+EVENT_SPILL_DIR     = tempfile.gettempdir()
+# 事件生成的并行条带数（1 为单线程；高分辨率摄像头可设为 CPU 核数）
+GENERATOR_WORKERS   = 1
+# 对数强度像素模型：大幅变化按 floor(|Δ|/C) 发出多个事件，时间戳在相邻两帧采集时间间插值；
+# 此时阈值滑块为对数对比度（每档 0.01）。False（默认）为相邻帧灰度差分、每像素每帧至多一个事件
+GENERATOR_LOG_INTENSITY = False
+# 背景活动噪声滤波的时间窗（微秒）：8 邻域内该时间内无其他事件的孤立事件被丢弃；None 为关闭（默认）
+NOISE_FILTER_US     = None
+# 事件率预算（事件/秒，如 2000000）：超出时自动提高阈值，使保存与显示的负载有界；None 为关闭（默认）。
+# 分块 (行, 列) 时只提高繁忙区域的阈值，(1, 1) 为全局统一调整
+EVENT_RATE_BUDGET   = None
+RATE_CONTROL_TILES  = (4, 4)
+# 采集 → 生成队列长度与满队列策略（drop_oldest / drop_newest / block），生成 → 显示队列长度
+CAPTURE_QUEUE_SIZE  = 4
+CAPTURE_DROP_POLICY = DROP_OLDEST
+DISPLAY_QUEUE_SIZE  = 2
+# 实时时间窗输出：按 "Event Frame Period" 滑块的时长产出计数帧 / 体素网格，放入 CameraWorker.window_queue，
+# 界面的事件图改为显示最新时间窗的计数帧（每个时间窗为整帧张量，不需要时保持关闭）
+LIVE_WINDOWS        = False
+LIVE_VOXEL_BINS     = 5
+WINDOW_QUEUE_SIZE   = 8
+# 界面刷新上限（帧/秒）；实际按屏幕刷新率与该值的较小者定时刷新，与处理帧率无关
+DISPLAY_MAX_FPS     = 60
+# 指标输出：设为文件路径时每秒追加一行 JSON（各阶段耗时百分位、计数器与统计），None 为只在界面显示
+METRICS_LOG         = None
+
 class WorkerSignals(QObject):
-    update_frame = pyqtSignal(np.ndarray, np.ndarray, float)
+    stats = pyqtSignal(dict)    # 每秒一次的流水线统计
+
+class SaveSignals(QObject):
+    progress = pyqtSignal(int)          # 百分比
+    finished = pyqtSignal(str, bool)    # 路径，是否完整写出（False 表示已取消）
+    failed   = pyqtSignal(str)
+
+# 生成 → 显示传递的数据
+DisplayPacket = namedtuple('DisplayPacket', 'seq frame event_img n_events capture_ts generated_ts')
 
 class CameraWorker(threading.Thread):
-    def __init__(self, cam, generator, ui):
+    """
+    采集 → 生成 → 显示 三级流水线，由 pipeline.py 的各阶段组成：
+    camera_frames 在 prefetch 的后台线程中按摄像头自身速率采集，经 frame_queue（满时按策略丢帧）
+    交给本线程的 generate_events；结果放入 display_queue，界面线程由定时器按屏幕刷新率取最新一项
+    """
+    def __init__(self, cam, generator, ui, metrics, queue_size=CAPTURE_QUEUE_SIZE, drop_policy=CAPTURE_DROP_POLICY):
         super().__init__()
         self.cam = cam
         self.generator = generator
         self.ui = ui
+        self.metrics = metrics
         self.signals = WorkerSignals()
         self.running = False
-        self.last_update_time = time.time()
 
-        # —— 新增：队列缓存与 FPS 统计 —— #
-        self.frame_queue = queue.Queue(maxsize=5)
+        self.frame_queue   = StageQueue(queue_size, drop_policy)
+        self.display_queue = StageQueue(DISPLAY_QUEUE_SIZE, DROP_OLDEST)
+        self.window_queue  = None
+        if generator.windows is not None:
+            self.window_queue = StageQueue(WINDOW_QUEUE_SIZE, DROP_OLDEST)
+            generator.windows.on_window = self.window_queue.push
+
+        # —— 每秒统计 —— #
         self.fps_time = time.time()
         self.frame_count = 0
+        self.event_count = 0
+        self.latency_sum = 0.0
+        self.last_captured = 0
 
     def run(self):
         self.running = True
         print("[CameraWorker] Camera thread started")
-        while self.running:
-            # 1) 读取一帧
-            frame = self.cam.read()
-            if frame is None:
-                print("[CameraWorker] Unable to read camera frames")
-                continue
-
-            # 2) 入队缓冲
-            if not self.frame_queue.full():
-                self.frame_queue.put(frame)
-
-            # 3) FPS 统计
-            self.frame_count += 1
-            if time.time() - self.fps_time >= 1.0:
-                fps = self.frame_count / (time.time() - self.fps_time)
-                # 更新界面上的帧率显示
-                self.ui.fps_label.setText(f"FPS: {fps:.2f}")
-                self.fps_time = time.time()
-                self.frame_count = 0
-
-            # 4) 出队并处理
-            proc_frame = self.frame_queue.get()
+        # 采集时间含等待下一帧，约等于帧间隔；远大于帧间隔说明采集端本身卡顿
+        frames = prefetch(camera_frames(self.cam, lambda: self.running, self.metrics),
+                          stage_queue=self.frame_queue, on_idle=self._report_stats)
+        # 按摄像头原生分辨率处理，ROI / 合并由生成器完成；参数每帧从界面控件读取
+        # 单帧出错只跳过该帧（如个别坏帧、事件落盘偶发失败），采集与处理继续
+        batches = generate_events(
+            self._queued(frames), self.generator, keep_frame=True, metrics=self.metrics,
+            on_error=self._on_error,
+            threshold=self.ui.threshold_slider.value,
+            decay=self.ui.decay_slider.value,
+            bg_color=lambda: self.ui.color_map[self.ui.bg_combo.currentText()],
+        )
+        try:
+            run(batches, CallbackSink(self._publish))
+        except Exception:
+            # 采集端本身出错：run 已关闭整条管线（含采集线程）
+            print("[CameraWorker] 流水线出错，已停止:")
+            traceback.print_exc()
+        finally:
+            frames.close()
+        self.running = False
+        print("[CameraWorker] Camera thread stopped")
 
-            try:
-                # 固定处理流程
-                proc_frame = cv2.resize(proc_frame, (1280, 720), interpolation=cv2.INTER_LINEAR)
-                gray_cpu = cv2.UMat(cv2.cvtColor(proc_frame, cv2.COLOR_BGR2GRAY)).get()
-                threshold = self.ui.threshold_slider.value()
-                decay     = self.ui.decay_slider.value()
-                bg_color  = self.ui.color_map[self.ui.bg_combo.currentText()]
-
-                events, event_img = self.generator.generate(
-                    gray_cpu,
-                    threshold=threshold,
-                    decay=decay,
-                    polarity_pos=True,
-                    polarity_neg=True,
-                    bg_color=bg_color
-                )
+    def _on_error(self, frame, exc):
+        print(f"[CameraWorker] 图像处理出错（帧 {frame.index}）:")
+        traceback.print_exception(type(exc), exc, exc.__traceback__)
+
+    def _queued(self, frames):
+        # 采集 → 开始处理的排队时间
+        for frame in frames:
+            self.metrics.add('queue', max(0.0, time.time() - frame.timestamp / 1e6))
+            yield frame
 
-                self.last_update_time = time.time()
-                # 事件速率：events数 / 时间间隔
-                rate = len(events) / max(1e-3, (time.time() - self.last_update_time))
-                self.signals.update_frame.emit(proc_frame, event_img, rate)
+    def _publish(self, batch):
+        try:
+            self._display(batch)
+        except Exception:
+            print("[CameraWorker] 结果发布出错:")
+            traceback.print_exc()
+        self._report_stats()
 
-            except Exception:
-                print("[CameraWorker] 图像处理出错:")
-                traceback.print_exc()
+    def _display(self, batch):
+        generated_ts = int(time.time() * 1e6)
+        n_events = len(batch.events)
+        self.metrics.count('frames_processed')
+        self.frame_count += 1
+        self.event_count += n_events
+        self.latency_sum += (generated_ts - batch.timestamp) / 1e3
+        self.display_queue.push(DisplayPacket(batch.index, batch.frame, batch.image, n_events,
+                                              batch.timestamp, generated_ts))
+
+    def _report_stats(self):
+        now = time.time()
+        elapsed = now - self.fps_time
+        if elapsed < 1.0:
+            return
+        total_captured = self.metrics.counter('frames_captured')
+        captured = total_captured - self.last_captured
+        event_filter = self.generator.event_filter
+        self.metrics.set('dropped_capture', self.frame_queue.dropped)
+        self.metrics.set('dropped_display', self.display_queue.dropped)
+        if event_filter is not None:
+            self.metrics.set('events_denoised', event_filter.removed)
+        stats = {
+            'capture_fps':     captured / elapsed,
+            'process_fps':     self.frame_count / elapsed,
+            'event_rate':      self.event_count / elapsed,
+            'pipeline_ms':     self.latency_sum / self.frame_count if self.frame_count else 0.0,
+            'dropped_capture': self.frame_queue.dropped,
+            'dropped_display': self.display_queue.dropped,
+            'capture_jitter_ms': self.cam.stats()['jitter_ms'],
+            'noise_filter':    event_filter.stats() if event_filter else None,
+            'threshold':       (self.generator.rate_controller.effective_threshold
+                                if self.generator.rate_controller else None),
+        }
+        # 快照（写出到 METRICS_LOG 时连同本秒统计一起）随统计一并交给界面
+        stats['metrics'] = self.metrics.report(**stats)
+        self.signals.stats.emit(stats)
+        self.last_captured = total_captured
+        self.fps_time = now
+        self.frame_count = 0
+        self.event_count = 0
+        self.latency_sum = 0.0
 
     def stop(self):
         self.running = False
 
+class SaveWorker(threading.Thread):
+    """
+    后台保存线程：在 Qt 线程之外调用 event_saver 中的保存函数，并通过信号报告进度
+    """
+    def __init__(self, save_fn, events, path, metrics, **kwargs):
+        super().__init__(daemon=True)
+        self.save_fn = save_fn
+        self.events = events
+        self.path = path
+        self.metrics = metrics
+        self.kwargs = kwargs
+        self.signals = SaveSignals()
+        self.cancel_event = threading.Event()
+        self._percent = -1
+
+    def _on_progress(self, done, total):
+        percent = int(100 * done / total) if total else 100
+        if percent != self._percent:
+            self._percent = percent
+            self.signals.progress.emit(percent)
+
+    def run(self):
+        try:
+            with self.metrics.time('save'):
+                completed = self.save_fn(self.events, self.path, progress=self._on_progress,
+                                         cancel=self.cancel_event, **self.kwargs)
+            self.signals.finished.emit(self.path, bool(completed))
+        except Exception as e:
+            print("[SaveWorker] 保存出错:")
+            traceback.print_exc()
+            self.signals.failed.emit(str(e))
+
+    def cancel(self):
+        self.cancel_event.set()
+
 class MainApp(EventCameraUI):
     def __init__(self):
         super().__init__()
         self.cam = None
-        self.generator = EventGenerator()
+        spill_path = os.path.join(EVENT_SPILL_DIR, generate_timestamp_filename("events_spill", "evt"))
+        windows = None
+        if LIVE_WINDOWS:
+            windows = EventWindowAccumulator(self.time_window_slider.value() * 1000,
+                                             bins=LIVE_VOXEL_BINS, skip_empty=True)
+            self.time_window_slider.valueChanged.connect(lambda ms: windows.set_window(ms * 1000))
+        self.generator = EventGenerator(
+            event_buffer=EventRingBuffer(EVENT_RING_CAPACITY, spill_path=spill_path),
+            workers=GENERATOR_WORKERS,
+            log_intensity=GENERATOR_LOG_INTENSITY,
+            event_filter=BackgroundActivityFilter(NOISE_FILTER_US) if NOISE_FILTER_US else None,
+            rate_controller=(ThresholdController(EVENT_RATE_BUDGET, tiles=RATE_CONTROL_TILES)
+                             if EVENT_RATE_BUDGET else None),
+            rgb=True,
+            time_surface=True,
+            windows=windows
+        )
         self.worker = None
+        self.save_worker = None
+        # 各阶段耗时 / 计数器，由采集、生成、显示、保存线程共同记录
+        self.metrics = Metrics(sink=MetricsWriter(METRICS_LOG) if METRICS_LOG else None)
+        # 显示缓冲：每个 QLabel 一块，按标签当前尺寸缩放后复用
+        self._display_bufs = {}
+        # 最近一个时间窗（LIVE_WINDOWS）及其渲染结果
+        self._window = None
+        self._window_img = None
+        # 按屏幕刷新率定时取最新结果显示，处理再快也不会占满界面线程
+        refresh = QApplication.primaryScreen().refreshRate() or DISPLAY_MAX_FPS
+        self.display_timer = QTimer(self)
+        self.display_timer.setInterval(int(1000 / min(refresh, DISPLAY_MAX_FPS)))
+        self.display_timer.timeout.connect(self.update_display)
         # 背景色映射
         self.color_map = {
-            "White backgrounds": (255, 255, 255),
-            "Black backgrounds": (0, 0, 0),
-            "Gray backgrounds": (127, 127, 127)
+            "White Background": (255, 255, 255),
+            "Black Background": (0, 0, 0),
+            "Gray Background": (127, 127, 127)
         }
         # 按钮绑定
         self.start_cam_btn.clicked.connect(self.start_camera)
         self.stop_cam_btn.clicked.connect(self.stop_camera)
         self.save_csv_btn.clicked.connect(self._save_csv)
         self.save_npz_btn.clicked.connect(self._save_npz)
+        self.save_evt_btn.clicked.connect(self._save_evt)
+        self.save_packed_btn.clicked.connect(self._save_packed)
+        self.cancel_save_btn.clicked.connect(self._cancel_save)
 
     def start_camera(self):
         if self.cam is None:
             try:
-                self.cam = CameraStream()
-                self.cam.set_resolution(1280, 720)
-                print("[MainApp] 摄像头打开成功")
+                self.cam = CameraStream(CAMERA_SOURCE, **CAMERA_FORMAT)
+                print("[MainApp] 摄像头打开成功:", self.cam.info())
             except RuntimeError as e:
                 QMessageBox.critical(self, "摄像头错误", str(e))
                 return
         if self.worker is None:
-            self.worker = CameraWorker(self.cam, self.generator, self)
-            self.worker.signals.update_frame.connect(self.update_display)
+            self.worker = CameraWorker(self.cam, self.generator, self, self.metrics)
+            self.worker.signals.stats.connect(self.update_stats)
             self.worker.start()
+            self.display_timer.start()
 
     def stop_camera(self):
+        self.display_timer.stop()
         if self.worker:
             self.worker.stop()
             self.worker.join()
@@ -131,33 +298,153 @@ class MainApp(EventCameraUI):
             self.cam = None
         self.label_raw.clear()
         self.label_event.clear()
+        self._window = self._window_img = None
         self.fps_label.setText("FPS: 0")
+        self.latency_label.setText("Latency: 0 ms")
+        self.threshold_label.setText("Effective Threshold: -")
+        self.stage_label.setText("")
 
-    def update_display(self, frame, event_img, rate):
-        # 原图 & 事件图 刷新
-        self._set_image(self.label_raw, frame)
-        self._set_image(self.label_event, event_img)
-        # 事件速率显示
-        self.fps_label.setText(f"Event rates：{rate:.1f} events/sec")
-
-    def _set_image(self, label, img_bgr):
-        img_resized = cv2.resize(img_bgr, (1280, 720))
-        img_rgb = cv2.cvtColor(img_resized, cv2.COLOR_BGR2RGB)
-        h, w, _ = img_resized.shape
-        qimg = QImage(img_rgb.data, w, h, 3 * w, QImage.Format_RGB888)
+    def update_display(self):
+        # 只显示最新结果，积压的旧结果直接丢弃
+        packet = self.worker.display_queue.pop_latest() if self.worker else None
+        if packet is None:
+            return
+        with self.metrics.time('render'):
+            bg_color = self.color_map[self.bg_combo.currentText()]
+            if self.worker.window_queue is not None:
+                # 事件图：最新时间窗的计数帧
+                event_img = self._render_window(self.worker.window_queue.pop_latest(), bg_color,
+                                                packet.capture_ts)
+            else:
+                # 事件图：按衰减滑块把时间面渲染成拖影图，只在显示时计算
+                event_img = self.generator.render_time_surface(
+                    decay=self.decay_slider.value(),
+                    bg_color=bg_color,
+                    now=packet.capture_ts
+                )
+            if event_img is None:
+                event_img = packet.event_img
+            # 原图（BGR）& 事件图（生成器直接输出 RGB）刷新
+            self._set_image(self.label_raw, packet.frame, QImage.Format_BGR888, cv2.INTER_LINEAR)
+            self._set_image(self.label_event, event_img, QImage.Format_RGB888, cv2.INTER_NEAREST)
+        self.metrics.count('frames_displayed')
+        # 端到端延迟：采集时刻 → 显示时刻
+        latency_ms = (time.time() * 1e6 - packet.capture_ts) / 1e3
+        self.latency_label.setText(f"Latency: {latency_ms:.1f} ms")
+
+    def _render_window(self, window, bg_color, now):
+        # 计数帧 → RGB 图：正事件多的像素为红、负事件多的为蓝，其余为背景；
+        # 没有新时间窗时沿用上一个，其结束已超过一个时间窗长度（无事件的空窗不产出）时显示空白
+        if window is not None:
+            self._window = window
+        window = self._window
+        if window is None:
+            return None
+        if self._window_img is None or self._window_img.shape[:2] != window.counts.shape[1:]:
+            self._window_img = np.empty(window.counts.shape[1:] + (3,), dtype=np.uint8)
+        img = self._window_img
+        img[...] = bg_color[::-1]
+        if now - window.t1 <= window.t1 - window.t0:
+            pos, neg = window.counts
+            img[pos > neg] = (255, 0, 0)
+            img[neg > pos] = (0, 0, 255)
+        return img
+
+    def update_stats(self, stats):
+        self.fps_label.setText(f"FPS: capture {stats['capture_fps']:.1f} / processed {stats['process_fps']:.1f} "
+                               f"(dropped {stats['dropped_capture']}, jitter {stats['capture_jitter_ms']:.1f} ms)")
+        text = f"Event Rates：{stats['event_rate']:.0f} events/sec"
+        noise = stats['noise_filter']
+        if noise is not None:
+            text += f" (noise removed {noise['removed_fraction']:.0%}, {noise['last_ms']:.1f} ms/frame)"
+        self.event_rate_label.setText(text)
+        threshold = stats['threshold']
+        if threshold is None:
+            threshold = self.threshold_slider.value()
+        self.threshold_label.setText(f"Effective Threshold: {threshold:.1f} (set {self.threshold_slider.value()})")
+        self.stage_label.setText(format_stages(stats['metrics']))
+
+    def _display_buffer(self, label, src_shape):
+        # 按标签当前尺寸等比缩放；尺寸不变时复用同一块缓冲
+        area = label.contentsRect()
+        h, w = src_shape[:2]
+        scale = min(area.width() / w, area.height() / h)
+        size = (max(1, int(w * scale)), max(1, int(h * scale)))
+        buf = self._display_bufs.get(label)
+        if buf is None or buf.shape[1::-1] != size:
+            buf = self._display_bufs[label] = np.empty((size[1], size[0], 3), dtype=np.uint8)
+        return buf
+
+    def _set_image(self, label, img, fmt, interpolation):
+        buf = self._display_buffer(label, img.shape)
+        if buf.shape == img.shape:
+            buf = np.ascontiguousarray(img)
+        else:
+            cv2.resize(img, buf.shape[1::-1], dst=buf, interpolation=interpolation)
+        h, w, _ = buf.shape
+        # QPixmap.fromImage 会复制像素，缓冲随后即可复用
+        qimg = QImage(buf.data, w, h, 3 * w, fmt)
         label.setPixmap(QPixmap.fromImage(qimg))
 
     def _save_csv(self):
         path, _ = QFileDialog.getSaveFileName(self, "Save event log as CSV", filter="CSV Files (*.csv)")
         if path:
-            save_event_csv(self.generator.event_buffer.copy(), path)
-            QMessageBox.information(self, "Save Successful", f"The event data has been saved to the：\n{path}")
+            self._start_save(save_event_csv, path)
 
     def _save_npz(self):
         path, _ = QFileDialog.getSaveFileName(self, "Save event log as NPZ", filter="NPZ Files (*.npz)")
         if path:
-            save_event_npz(self.generator.event_buffer.copy(), path)
+            self._start_save(save_event_npz, path)
+
+    def _save_evt(self):
+        path, _ = QFileDialog.getSaveFileName(self, "Save event log as EVT", filter="EVT Files (*.evt)")
+        if path:
+            h, w = self.generator.shape or (0, 0)
+            self._start_save(save_event_file, path, width=w, height=h)
+
+    def _save_packed(self):
+        path, _ = QFileDialog.getSaveFileName(self, "Save event log as packed events", filter="Packed Event Files (*.v2e)")
+        if path:
+            self._start_save(save_event_packed, path)
+
+    def _start_save(self, save_fn, path, **kwargs):
+        if self.save_worker is not None:
+            QMessageBox.warning(self, "Saving", "A save is already in progress.")
+            return
+        # 事件快照在保存线程中获取（环形缓冲自带锁），界面线程不做任何复制
+        self.save_worker = SaveWorker(save_fn, self.generator.event_buffer, path, self.metrics, **kwargs)
+        self.save_worker.signals.progress.connect(self.save_progress.setValue)
+        self.save_worker.signals.finished.connect(self._on_save_finished)
+        self.save_worker.signals.failed.connect(self._on_save_failed)
+        self._set_saving(True)
+        self.save_worker.start()
+
+    def _cancel_save(self):
+        if self.save_worker is not None:
+            self.save_worker.cancel()
+
+    def _set_saving(self, saving):
+        self.save_progress.setValue(0)
+        self.save_progress.setVisible(saving)
+        self.cancel_save_btn.setVisible(saving)
+        for btn in (self.save_csv_btn, self.save_npz_btn, self.save_evt_btn, self.save_packed_btn):
+            btn.setEnabled(not saving)
+
+    def _finish_save(self):
+        self.save_worker.join()
+        self.save_worker = None
+        self._set_saving(False)
+
+    def _on_save_finished(self, path, completed):
+        self._finish_save()
+        if completed:
             QMessageBox.information(self, "Save Successful", f"The event data has been saved to the：\n{path}")
+        else:
+            QMessageBox.information(self, "Save Cancelled", "Saving was cancelled.")
+
+    def _on_save_failed(self, message):
+        self._finish_save()
+        QMessageBox.critical(self, "Save Failed", message)
 
 if __name__ == '__main__':
     app = QApplication(sys.argv)
@@ -170,6 +457,13 @@ if __name__ == '__main__':
             main_window.worker.join()
         if main_window.cam:
             main_window.cam.release()
+        if main_window.save_worker:
+            main_window.save_worker.cancel()
+            main_window.save_worker.join()
+        main_window.generator.close()
+        main_window.generator.event_buffer.close(delete=True)
+        if main_window.metrics.sink is not None:
+            main_window.metrics.sink.close()
         print("[MainApp] 已完成资源释放")
 
     app.aboutToQuit.connect(on_exit)
@@ -1,9 +1,20 @@
+import os
 import cv2
 import time
+import shutil
+import tempfile
 import numpy as np
+from concurrent.futures import ProcessPoolExecutor
 
+from metrics import Metrics, MetricsWriter
+from camera_stream import VideoReader, ImageFolderCapture
+from event_buffer import DiscardEvents
 from event_generator import EventGenerator
-from event_saver import save_event_csv, save_event_npz
+from event_filter import BackgroundActivityFilter
+from event_file import EventFileWriter, EventFileReader
+from pipeline import (video_frames, generate_events, run, EventFileSink, EventVideoSink, MetricsSink,
+                      CallbackSink)
+from event_saver import save_event_csv, save_event_npz, save_event_packed, save_event_windows
 
 # ———– User Settings ———–
 # Set your input/output paths and parameters here:
@@ -13,93 +24,309 @@ output_path = r"C:\Users\18795\Desktop\event_output.avi"
 threshold   = 15       # gray-level difference threshold
 decay       = 10       # time decay factor
 bg          = 'white'  # 'white', 'black', or 'gray'
+roi         = None     # (x, y, w, h) region of the input to convert, None = whole frame
+binning     = 1        # integer downsampling factor applied inside the generator
+workers     = 1        # parallel row stripes in the generator (e.g. CPU cores for 1080p/4K)
+log_intensity = False  # DVS log-intensity model: several events per pixel, interpolated timestamps
+                       # (threshold is then a log contrast in 0.01 steps, e.g. 20 -> 0.2)
+denoise_us  = 0        # background-activity filter window (us): drop events with no neighbour
+                       # event within this time; 0 = off
+processes   = 1        # >1: split the video into frame ranges converted by a process pool
+                       # (with log_intensity each range replays all earlier frames: limited speedup)
+metrics_log = None     # path: append per-stage timings (read/generate/write) as JSON lines
+start_frame = 0        # first frame to convert
+end_frame   = None     # stop before this frame, None = to the end of the video
+frame_step  = 1        # convert every n-th frame (event timestamps stay on the video clock)
 
 save_csv    = True
 csv_path    = r"C:\Users\18795\Desktop\events.csv"
 
 save_npz    = True
 npz_path    = r"C:\Users\18795\Desktop\events.npz"
+
+# Time-indexed binary recording, written while converting (see event_file.py)
+save_evt    = True
+evt_path    = r"C:\Users\18795\Desktop\events.evt"
+
+# Bit-packed events, ~6 bytes/event (see event_codec.py)
+save_packed = True
+packed_path = r"C:\Users\18795\Desktop\events.v2e"
+
+# Fixed time-window event-count frames + voxel grids for model input (see event_window.py)
+save_windows = False
+windows_path = r"C:\Users\18795\Desktop\event_windows.npz"
+window_ms    = 5        # time window length (ms)
+voxel_bins   = 5        # voxel grid time bins, 0 = count frames only
 # —————————————————
 
-def main():
-    # Open video file
-    cap = cv2.VideoCapture(input_path)
-    if not cap.isOpened():
-        print(f"Error: cannot open video file {input_path}")
-        return
+# Background color map
+BG_MAP = {
+    'white': (255, 255, 255),
+    'black': (  0,   0,   0),
+    'gray' : (127, 127, 127)
+}
 
-    # Video parameters (dynamic resolution)
-    fps    = cap.get(cv2.CAP_PROP_FPS) or 30.0
-    width  = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
-    height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+VIDEO_FOURCC = 'XVID'
 
-    # Output VideoWriter (XVID) at same resolution
-    fourcc = cv2.VideoWriter_fourcc(*'XVID')
-    out    = cv2.VideoWriter(output_path, fourcc, fps, (width, height))
 
-    # Background color map
-    bg_map = {
-        'white': (255, 255, 255),
-        'black': (  0,   0,   0),
-        'gray' : (127, 127, 127)
-    }
-    bg_color = bg_map.get(bg, (255,255,255))
+def convert_range(input_path, video_path, evt_path, start=0, end=None, step=1, threshold=15, decay=10,
+                  bg_color=(255, 255, 255), roi=None, binning=1, workers=1, log_intensity=False,
+                  denoise_us=0, verbose=False, metrics=None, origin=None):
+    """
+    Convert frames start, start+step, ... (< end) of a video into an event video and an
+    .evt recording. video_path may be None to skip writing the event video.
 
-    # Event generator and log storage
-    generator  = EventGenerator()
-    all_events = []
+    Built from pipeline.py stages: frames are decoded and converted to grayscale ahead of
+    the generator by a VideoReader thread, so decoding overlaps event generation, and each
+    frame's events and event image go straight to the .evt / video sinks.
+    When start >= step the generator's reference is seeded with frame start-step, so the
+    events at a range boundary are the same as in a single sequential pass.
+    Timestamps are taken from the video clock (frame_idx / fps), not the wall clock.
+    origin: first frame of the whole conversion when this call converts one of its ranges.
+    With log_intensity the per-pixel reference levels carry sub-threshold residue across
+    frames, so the frames from origin's seed up to start-step are replayed through
+    EventGenerator.advance (reference update only, no events) and the range starts from
+    exactly the state a sequential pass has there.
+    denoise_us > 0 runs each frame's events through a BackgroundActivityFilter before
+    they are written; its removal rate and cost are printed when verbose. When converting
+    a range, the frames whose events fall within denoise_us before the boundary are
+    generated in full (events discarded) to prime the filter's support map, so events at
+    the start of the range keep their support from the previous range.
+    metrics: optional Metrics; the read (waiting on the decoder) / generate / evt / write
+    stages are timed into it and a snapshot is reported (written to its sink, if any) every 50
+    frames and at the end.
+    Returns (frames converted, events generated).
+    """
+    if metrics is None:
+        metrics = Metrics()
+    step = max(1, int(step))
+    fps = _source_fps(input_path)
+    first = start
+    if origin is not None and origin < start:
+        if log_intensity:
+            first = origin
+        elif denoise_us:
+            # Frames within denoise_us of the boundary, plus one more as their reference
+            primed = int(np.ceil(denoise_us * fps / 1e6 / step))
+            first = max(origin, start - step * (primed + 1))
+    if first >= step:
+        first -= step
+    seed = first < start
+    reader = VideoReader(input_path, start=first, end=end, step=step, gray=True)
 
-    frame_idx  = 0
-    start_time = time.time()
+    # Events only flow to the sinks; each event image is written out before the next
+    # frame is generated, so the generator's preallocated buffers can be reused.
+    noise_filter = BackgroundActivityFilter(denoise_us) if denoise_us else None
+    generator = EventGenerator(event_buffer=DiscardEvents(), roi=roi, binning=binning,
+                               reuse_buffers=True, workers=workers, log_intensity=log_intensity,
+                               event_filter=noise_filter)
+    out_w, out_h = generator.output_size(reader.width, reader.height)
+    evt = EventFileSink(evt_path, out_w, out_h)
+    sinks = [evt]
+    if video_path is not None:
+        sinks.append(EventVideoSink(video_path, fps / step, (out_w, out_h), VIDEO_FOURCC))
+    sinks.append(MetricsSink(metrics, 50, noise_filter, source=input_path))
+    if verbose:
+        start_time = time.time()
+        done = 0
 
-    # Fixed internal resolution for the generator
-    target_W, target_H = 1280, 720
+        def progress(batch):
+            nonlocal done
+            done += 1
+            if done % 50 == 0:
+                elapsed = time.time() - start_time
+                print(f"Processed {done} frames in {elapsed:.1f}s "
+                      f"(avg FPS {done/elapsed:.2f})")
+        sinks.append(CallbackSink(progress, name=None))
+
+    frames = video_frames(reader, metrics)
+    if seed:
+        boundary_ts = int(round((start - step) * 1e6 / fps))
+        for frame in frames:
+            timestamp = int(round(frame.index * 1e6 / fps))
+            if noise_filter is not None and timestamp >= boundary_ts - denoise_us:
+                generator.generate(frame.image, threshold=threshold, decay=decay, bg_color=bg_color,
+                                   timestamp=timestamp)
+            else:
+                generator.advance(frame.image, threshold=threshold, timestamp=timestamp)
+            if frame.index >= start - step:
+                break
+        if noise_filter is not None:
+            noise_filter.reset_stats()
+
+    batches = generate_events(frames, generator, fps=fps, metrics=metrics,
+                              threshold=threshold, decay=decay, bg_color=bg_color)
+    try:
+        n_frames, _ = run(batches, *sinks, metrics=metrics)
+    finally:
+        frames.close()
+        generator.close()
+    if verbose and noise_filter is not None:
+        print(f"Noise filter removed {noise_filter.removed} of {noise_filter.total} events "
+              f"({noise_filter.removed_fraction:.1%}), {noise_filter.mean_ms:.2f} ms/frame")
+    return n_frames, len(evt)
+
+
+def _source_fps(path):
+    # Same frame rate VideoReader uses for the video clock
+    cap = ImageFolderCapture(path) if os.path.isdir(path) else cv2.VideoCapture(path)
+    fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+    cap.release()
+    return fps
+
+
+def _convert_range_task(task):
+    # Top-level wrapper so the pool can pickle it
+    args, kwargs = task
+    return convert_range(*args, **kwargs)
 
-    print("Starting processing, input:", input_path)
-    while True:
-        ret, frame = cap.read()
-        if not ret:
-            break
-
-        # Convert to gray and resize to generator's expected size
-        gray_orig = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-        gray = cv2.resize(gray_orig, (target_W, target_H))
-
-        # Generate events & small event image
-        events_small, event_img_small = generator.generate(
-            gray,
-            threshold=threshold,
-            decay=decay,
-            bg_color=bg_color
-        )
 
-        # Scale events back to original resolution
-        scaled_events = []
-        for x, y, p, t in events_small:
-            x2 = int(x * (width  / target_W))
-            y2 = int(y * (height / target_H))
-            scaled_events.append((x2, y2, p, t))
-        all_events.extend(scaled_events)
+def _merge_parts(parts, video_path, evt_path):
+    """Concatenate per-range event videos and .evt recordings in range order."""
+    if video_path is not None:
+        first = cv2.VideoCapture(parts[0][0])
+        fps = first.get(cv2.CAP_PROP_FPS) or 30.0
+        size = (int(first.get(cv2.CAP_PROP_FRAME_WIDTH)), int(first.get(cv2.CAP_PROP_FRAME_HEIGHT)))
+        first.release()
 
-        # Resize event image back to original resolution and write
-        event_img = cv2.resize(event_img_small, (width, height))
-        out.write(event_img)
+        out = cv2.VideoWriter(video_path, cv2.VideoWriter_fourcc(*VIDEO_FOURCC), fps, size)
+        for part_video, _ in parts:
+            cap = cv2.VideoCapture(part_video)
+            while True:
+                ret, frame = cap.read()
+                if not ret:
+                    break
+                out.write(frame)
+            cap.release()
+        out.release()
 
-        frame_idx += 1
-        if frame_idx % 50 == 0:
-            elapsed = time.time() - start_time
-            print(f"Processed {frame_idx} frames in {elapsed:.1f}s (avg FPS {frame_idx/elapsed:.2f})")
+    reader = EventFileReader(parts[0][1])
+    with EventFileWriter(evt_path, reader.width, reader.height) as writer:
+        for _, part_evt in parts:
+            for chunk in EventFileReader(part_evt).iter_chunks():
+                writer.append(chunk)
 
+
+def convert_video(input_path, output_path, evt_path, processes=1, verbose=True, metrics=None,
+                  start=0, end=None, step=1, **params):
+    """
+    Convert a video, sequentially or split into frame ranges over a process pool.
+    start / end / step select frames start, start+step, ... (< end; None = to the end).
+
+    params are passed to convert_range (threshold, decay, bg_color, roi, binning, workers,
+    log_intensity, denoise_us).
+    metrics is timed per stage in a sequential run; with a process pool only the frame and
+    event counters are updated, once per finished range.
+    With log_intensity each range first decodes and replays every earlier frame through
+    EventGenerator.advance (about a third of the cost of converting a frame), so the last
+    range does roughly 1/processes + (1 - 1/processes)/3 of the sequential work and the
+    total work grows with processes: the speedup is limited (about 2x on 4 cores) and a
+    pool is slower than a sequential pass when there are fewer cores than processes.
+    Returns (frames converted, events generated).
+    """
+    cap = cv2.VideoCapture(input_path)
+    if not cap.isOpened():
+        raise IOError(f"cannot open video file {input_path}")
+    n_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
     cap.release()
-    out.release()
+
+    step = max(1, int(step))
+    stop = n_frames if end is None else min(int(end), n_frames)
+    n_selected = max(0, -(-(stop - start) // step))
+    processes = max(1, min(int(processes), n_selected))
+    if processes == 1:
+        return convert_range(input_path, output_path, evt_path, start, end, step,
+                             verbose=verbose, metrics=metrics, **params)
+
+    # Ranges start on the step grid; the last one runs to end (or EOF, so an
+    # inaccurate frame count never drops frames)
+    bounds = start + step * (np.linspace(0, n_selected, processes + 1).astype(int))
+    ranges = list(zip(bounds[:-1], list(bounds[1:-1]) + [end]))
+    params = dict(params, step=step, origin=start)
+    tmp_dir = tempfile.mkdtemp(prefix="v2e_parts_")
+    try:
+        parts = [(os.path.join(tmp_dir, f"part_{k:04d}.avi") if output_path is not None else None,
+                  os.path.join(tmp_dir, f"part_{k:04d}.evt"))
+                 for k in range(len(ranges))]
+        tasks = [((input_path, video, evt, int(start), None if end is None else int(end)), params)
+                 for (video, evt), (start, end) in zip(parts, ranges)]
+
+        total_frames = total_events = 0
+        start_time = time.time()
+        with ProcessPoolExecutor(max_workers=processes) as pool:
+            for k, (frames, events) in enumerate(pool.map(_convert_range_task, tasks)):
+                total_frames += frames
+                total_events += events
+                if metrics is not None:
+                    metrics.count('frames', frames)
+                    metrics.count('events', events)
+                    metrics.report(source=input_path, ranges_done=k + 1)
+                if verbose:
+                    elapsed = time.time() - start_time
+                    print(f"Range {k + 1}/{len(tasks)} done: {total_frames} frames in {elapsed:.1f}s "
+                          f"(avg FPS {total_frames/elapsed:.2f})")
+
+        _merge_parts(parts, output_path, evt_path)
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+    return total_frames, total_events
+
+
+def main():
+    print("Starting processing, input:", input_path)
+
+    # Events are always streamed to an .evt recording; the other formats are
+    # exported from its memory map, so memory stays flat for long videos.
+    tmp_evt = None if save_evt else os.path.join(tempfile.gettempdir(), f"v2e_{os.getpid()}.evt")
+    events_path = evt_path if save_evt else tmp_evt
+    metrics = Metrics(sink=MetricsWriter(metrics_log) if metrics_log else None)
+    try:
+        convert_video(
+            input_path, output_path, events_path,
+            processes=processes,
+            metrics=metrics,
+            start=start_frame,
+            end=end_frame,
+            step=frame_step,
+            threshold=threshold,
+            decay=decay,
+            bg_color=BG_MAP.get(bg, (255, 255, 255)),
+            roi=roi,
+            binning=binning,
+            workers=workers,
+            log_intensity=log_intensity,
+            denoise_us=denoise_us,
+        )
+    except IOError as e:
+        print(f"Error: {e}")
+        return
+    finally:
+        if metrics.sink is not None:
+            metrics.sink.close()
     print("✔  Event video saved to:", output_path)
+    if save_evt:
+        print("✔  Events saved as EVT:", evt_path)
 
+    reader = EventFileReader(events_path)
+    all_events = reader.events
     if save_csv:
         save_event_csv(all_events, csv_path)
         print("✔  Events saved as CSV:", csv_path)
     if save_npz:
         save_event_npz(all_events, npz_path)
         print("✔  Events saved as NPZ:", npz_path)
+    if save_packed:
+        save_event_packed(all_events, packed_path)
+        print("✔  Events saved as packed:", packed_path)
+    if save_windows:
+        save_event_windows(all_events, windows_path, int(window_ms * 1000),
+                           reader.width, reader.height, bins=voxel_bins)
+        print("✔  Event windows saved as NPZ:", windows_path)
+
+    del all_events
+    reader.close()
+    if tmp_evt is not None and os.path.exists(tmp_evt):
+        os.remove(tmp_evt)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,128 @@
+# 文件：metrics.py
+import json
+import time
+import threading
+from collections import deque
+from contextlib import contextmanager
+
+import numpy as np
+
+# 各阶段保留的最近耗时样本数（滚动百分位的窗口）
+METRICS_WINDOW = 300
+
+
+class Metrics:
+    """
+    轻量级流水线计时：各阶段耗时的滚动百分位 + 累计计数器，可多线程同时记录
+
+    用法：
+        with metrics.time('generate'):
+            ...
+        metrics.add('capture', seconds)
+        metrics.count('dropped_frames', n)
+        metrics.report(frame=k)   # 返回快照；设置了 sink 时同时写出一行 JSON
+    sink: 可选的 MetricsWriter（或任何提供 write(dict) 的对象）
+    """
+    def __init__(self, window=METRICS_WINDOW, sink=None):
+        self.window = window
+        self.sink = sink
+        self._samples = {}
+        self._totals = {}
+        self._counters = {}
+        self._lock = threading.Lock()
+        self._start = time.time()
+
+    def add(self, stage, seconds):
+        """记录某阶段一次耗时（秒）"""
+        with self._lock:
+            samples = self._samples.get(stage)
+            if samples is None:
+                samples = self._samples[stage] = deque(maxlen=self.window)
+                self._totals[stage] = [0, 0.0]
+            samples.append(seconds)
+            total = self._totals[stage]
+            total[0] += 1
+            total[1] += seconds
+
+    @contextmanager
+    def time(self, stage):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(stage, time.perf_counter() - start)
+
+    def count(self, name, n=1):
+        """累加计数器（帧数、丢帧数、事件数等）"""
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + n
+
+    def counter(self, name):
+        """计数器当前值（未记录过为 0）"""
+        with self._lock:
+            return self._counters.get(name, 0)
+
+    def set(self, name, value):
+        """直接设置计数器（用于由其他组件维护的累计值，如队列丢弃数）"""
+        with self._lock:
+            self._counters[name] = value
+
+    def snapshot(self):
+        """
+        {'uptime_s', 'stages': {阶段: {count, mean_ms, p50_ms, p90_ms, p99_ms, max_ms}}, 'counters': {...}}
+        count / mean_ms 为累计值，百分位与 max_ms 基于最近 window 个样本
+        """
+        with self._lock:
+            samples = {stage: np.array(s) for stage, s in self._samples.items()}
+            totals = {stage: tuple(t) for stage, t in self._totals.items()}
+            counters = dict(self._counters)
+        stages = {}
+        for stage, values in samples.items():
+            n, total = totals[stage]
+            p50, p90, p99 = np.percentile(values, (50, 90, 99)) * 1e3
+            stages[stage] = {
+                'count': n,
+                'mean_ms': total * 1e3 / n,
+                'p50_ms': float(p50),
+                'p90_ms': float(p90),
+                'p99_ms': float(p99),
+                'max_ms': float(values.max() * 1e3),
+            }
+        return {'uptime_s': time.time() - self._start, 'stages': stages, 'counters': counters}
+
+    def report(self, **extra):
+        """生成快照（附加 extra 字段）；设置了 sink 时写出"""
+        snapshot = self.snapshot()
+        snapshot.update(extra)
+        if self.sink is not None:
+            self.sink.write(snapshot)
+        return snapshot
+
+
+class MetricsWriter:
+    """
+    以 JSON Lines 写出指标快照：每行一个 JSON 对象，带墙钟时间戳 'time'，便于无界面运行时
+    用 tail -f / jq / pandas.read_json(lines=True) 分析
+    """
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'a', buffering=1)
+        self._lock = threading.Lock()
+
+    def write(self, record):
+        line = json.dumps(dict(record, time=time.time()), default=float)
+        with self._lock:
+            self._file.write(line + '\n')
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+
+def format_stages(snapshot, stages=None):
+    """把快照中的阶段耗时格式化为多行文本：阶段  p50 / p99 (ms)"""
+    lines = []
+    for stage, s in snapshot['stages'].items():
+        if stages is None or stage in stages:
+            lines.append(f"{stage:<10s} p50 {s['p50_ms']:6.2f}  p99 {s['p99_ms']:6.2f} ms")
+    return '\n'.join(lines)
@@ -0,0 +1,513 @@
+# 文件：multi_camera.py
+"""
+多路视频源采集：每路一个事件生成进程，帧与事件均经共享内存传递
+
+    采集线程（主进程） ──帧槽──▶ 生成进程（每路一个） ──事件环──▶ 主进程（事件存储 / 显示）
+
+- 帧：每路一个 SharedFrameRing。采集线程把帧写入空闲槽，生成进程直接在共享内存上做灰度转换
+  与事件生成（不复制），并把事件图写回同一槽；槽号、序号和时间戳经 multiprocessing.Queue 传递。
+  没有空闲槽（生成跟不上）时丢弃新帧并计数。
+- 事件：每路一个 SharedEventRing（x/y/t/p 四列），生成进程把事件批次写入，主进程按消息给出的
+  区间读出后归还空间。
+各路的生成互不争抢 GIL，多路 720p 摄像头可各占一个 CPU 核。
+视频文件 / 图片目录按自身帧率节流（见 CameraStream），可在无摄像头时测试。
+
+命令行（无界面，各路事件分别写入 .evt）：
+    python multi_camera.py cam0.mp4 cam1.mp4 --seconds 10 -o out
+"""
+import os
+import sys
+import time
+import queue
+import argparse
+import threading
+import multiprocessing as mp
+from multiprocessing import shared_memory
+
+import cv2
+import numpy as np
+
+from camera_stream import CameraStream
+from event_buffer import EventBuffer, empty_events
+from event_file import EventFileWriter
+from event_generator import EventGenerator
+from event_filter import BackgroundActivityFilter
+from rate_controller import ThresholdController
+
+# 每路的帧槽数：采集写入 1 + 生成处理 1 + 主进程显示持有 1，再留 1 个余量
+FRAME_SLOTS = 4
+# 每路事件环容量（事件数，约 13 字节/事件）
+EVENT_RING_CAPACITY = 1 << 22
+# 事件环满时生成进程等待主进程读走的最长时间（秒），超时后丢弃放不下的事件
+EVENT_RING_WAIT = 0.5
+
+# 事件环各列：(名称, 类型)，按 8 字节对齐依次排布
+_EVENT_COLUMNS = (('t', np.int64), ('x', np.uint16), ('y', np.uint16), ('p', np.int8))
+
+
+class SharedFrameRing:
+    """
+    共享内存中的帧槽环：slots 个 (h, w, 3) uint8 输入帧槽，以及（可选）同样个数的事件图槽
+
+    创建方传入 create=True 并负责 unlink()；其他进程按 name 附着
+    """
+    def __init__(self, slots, frame_shape, image_shape=None, name=None, create=False):
+        self.slots = int(slots)
+        self.frame_shape = tuple(frame_shape)
+        self.image_shape = tuple(image_shape) if image_shape else None
+        frame_bytes = self.slots * int(np.prod(self.frame_shape))
+        image_bytes = self.slots * int(np.prod(self.image_shape)) if self.image_shape else 0
+        self.shm = shared_memory.SharedMemory(name=name, create=create, size=frame_bytes + image_bytes)
+        self.frames = np.ndarray((self.slots,) + self.frame_shape, np.uint8, self.shm.buf)
+        self.images = (np.ndarray((self.slots,) + self.image_shape, np.uint8, self.shm.buf, offset=frame_bytes)
+                       if self.image_shape else None)
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    def close(self):
+        # 先释放对共享内存的数组引用，否则 close() 会因仍有导出的缓冲区而失败
+        self.frames = self.images = None
+        self.shm.close()
+
+    def unlink(self):
+        self.shm.unlink()
+
+
+class SharedEventRing:
+    """
+    共享内存中的列式事件环：写入方（生成进程）顺序追加，读取方（主进程）按区间读出后 release()
+
+    读位置保存在共享的 mp.Value 中；写入位置只有写入方使用，随消息把 (起点, 个数) 交给读取方。
+    位置均为单调递增的累计事件数，对容量取模得到下标，区间跨越环尾时分两段复制。
+    """
+    def __init__(self, capacity, read_pos, name=None, create=False):
+        self.capacity = int(capacity) + (-int(capacity)) % 8
+        size = sum(self.capacity * np.dtype(dtype).itemsize for _, dtype in _EVENT_COLUMNS)
+        self.shm = shared_memory.SharedMemory(name=name, create=create, size=size)
+        self.columns = {}
+        offset = 0
+        for key, dtype in _EVENT_COLUMNS:
+            self.columns[key] = np.ndarray(self.capacity, dtype, self.shm.buf, offset=offset)
+            offset += self.capacity * np.dtype(dtype).itemsize
+        self.read_pos = read_pos
+        self.write_pos = read_pos.value
+        self.dropped = 0
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    def _spans(self, start, n):
+        # 区间 [start, start + n) 在环上的一到两段 (下标起点, 下标终点, 输出偏移)
+        i = start % self.capacity
+        first = min(n, self.capacity - i)
+        spans = [(i, i + first, 0)]
+        if first < n:
+            spans.append((0, n - first, first))
+        return spans
+
+    def write(self, events, timeout=EVENT_RING_WAIT):
+        """追加一批事件，返回 (起点, 写入个数)；空间不足且等待超时时只写入放得下的部分"""
+        n = len(events)
+        deadline = time.perf_counter() + timeout
+        while self.capacity - (self.write_pos - self.read_pos.value) < n and time.perf_counter() < deadline:
+            time.sleep(0.001)
+        n = min(n, self.capacity - (self.write_pos - self.read_pos.value))
+        self.dropped += len(events) - n
+        start = self.write_pos
+        for i0, i1, k in self._spans(start, n):
+            for key, column in self.columns.items():
+                column[i0:i1] = events[key][k:k + i1 - i0]
+        self.write_pos += n
+        return start, n
+
+    def read(self, start, n):
+        """复制出区间内的事件（EVENT_DTYPE 数组）；读完后调用 release()"""
+        out = empty_events(n)
+        for i0, i1, k in self._spans(start, n):
+            for key, column in self.columns.items():
+                out[key][k:k + i1 - i0] = column[i0:i1]
+        return out
+
+    def release(self, end):
+        """归还 end 之前的空间"""
+        self.read_pos.value = end
+
+    def close(self):
+        self.columns = None
+        self.shm.close()
+
+    def unlink(self):
+        self.shm.unlink()
+
+
+class _SharedEventSink:
+    """生成进程中的事件存储：extend() 写入事件环并记下本帧的区间"""
+    def __init__(self, ring):
+        self.ring = ring
+        self.span = (ring.write_pos, 0)
+
+    def extend(self, events):
+        self.span = self.ring.write(events)
+
+
+def _generator_main(index, frame_ring_args, event_ring_args, read_pos, free_q, ready_q, result_q,
+                    control, options):
+    """
+    生成进程主循环：从 ready_q 取帧槽，原地生成事件，把事件写入事件环、事件图写回槽，
+    再通过 result_q 通知主进程 (路号, 槽号, 序号, 时间戳, 事件起点, 事件数, 生成耗时秒)
+    ready_q 中的 None 表示退出
+    """
+    frames = SharedFrameRing(*frame_ring_args)
+    capacity, name = event_ring_args
+    events_ring = SharedEventRing(capacity, read_pos, name=name)
+    sink = _SharedEventSink(events_ring)
+    denoise_us = options.get('denoise_us', 0)
+    rate_budget = options.get('rate_budget', 0)
+    render = frames.images is not None
+    generator = EventGenerator(
+        event_buffer=sink,
+        roi=options.get('roi'),
+        binning=options.get('binning', 1),
+        reuse_buffers=True,
+        workers=options.get('workers', 1),
+        log_intensity=options.get('log_intensity', False),
+        event_filter=BackgroundActivityFilter(denoise_us) if denoise_us else None,
+        rate_controller=(ThresholdController(rate_budget, tiles=options.get('rate_tiles', (1, 1)))
+                         if rate_budget else None),
+        rgb=options.get('rgb', False),
+        time_surface=render and options.get('time_surface', False),
+    )
+    bg_color = options.get('bg_color', (255, 255, 255))
+    try:
+        while True:
+            item = ready_q.get()
+            if item is None:
+                break
+            slot, seq, ts = item
+            start = time.perf_counter()
+            gray = cv2.cvtColor(frames.frames[slot], cv2.COLOR_BGR2GRAY)
+            sink.span = (events_ring.write_pos, 0)
+            _, event_img = generator.generate(gray, threshold=control[0], decay=control[1],
+                                              bg_color=bg_color, timestamp=ts)
+            if render:
+                if generator.time_surface:
+                    event_img = generator.render_time_surface(decay=control[1], bg_color=bg_color, now=ts)
+                np.copyto(frames.images[slot], event_img)
+            result_q.put((index, slot, seq, ts) + sink.span + (time.perf_counter() - start,))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        generator.close()
+        result_q.put((index, None, events_ring.dropped, 0, 0, 0, 0.0))
+        frames.close()
+        events_ring.close()
+
+
+class _CameraChannel:
+    """主进程中一路视频源的全部资源：CameraStream、采集线程、共享内存、队列与生成进程"""
+    def __init__(self, index, source, ctx, result_q, event_buffer, slots, event_capacity, options,
+                 camera_format, drop_frames):
+        self.index = index
+        self.source = source
+        self.drop_frames = drop_frames
+        self.cam = CameraStream(source, **camera_format)
+        info = self.cam.info()
+        self.frame_shape = (info['height'], info['width'], 3)
+        out_w, out_h = EventGenerator(roi=options.get('roi'), binning=options.get('binning', 1)).output_size(
+            info['width'], info['height'])
+        image_shape = (out_h, out_w, 3) if options.get('render', True) else None
+        self.image_size = (out_w, out_h)
+
+        self.frames = SharedFrameRing(slots, self.frame_shape, image_shape, create=True)
+        self.read_pos = ctx.Value('q', 0, lock=False)
+        self.events = SharedEventRing(event_capacity, self.read_pos, create=True)
+        self.event_buffer = event_buffer
+        self.control = ctx.Array('d', [options.get('threshold', 15), options.get('decay', 10)], lock=False)
+        self.free_q = ctx.Queue()
+        self.ready_q = ctx.Queue()
+        for slot in range(slots):
+            self.free_q.put(slot)
+        self.process = ctx.Process(
+            target=_generator_main, daemon=True,
+            args=(index, (slots, self.frame_shape, image_shape, self.frames.name),
+                  (event_capacity, self.events.name), self.read_pos,
+                  self.free_q, self.ready_q, result_q, self.control, options))
+
+        self.running = False
+        self.thread = threading.Thread(target=self._capture_loop, daemon=True)
+        self.finished = False
+        self.exited = False
+        self.latest = None          # (槽号, 序号, 时间戳)，主进程显示持有
+        self.captured = 0
+        self.dropped_frames = 0
+        self.processed = 0
+        self.n_events = 0
+        self.dropped_events = 0
+        self.generate_s = 0.0
+
+    def start(self):
+        self.process.start()
+        self.running = True
+        self.thread.start()
+
+    def _capture_loop(self):
+        seq = 0
+        h, w = self.frame_shape[:2]
+        while self.running:
+            frame, ts = self.cam.read_with_timestamp()
+            if frame is None:
+                if self.cam.finished:
+                    break
+                continue
+            self.captured += 1
+            slot = self._free_slot()
+            if slot is None:
+                # 生成进程跟不上：丢弃新帧，下一帧再试
+                self.dropped_frames += 1
+                continue
+            dst = self.frames.frames[slot]
+            if frame.shape[:2] == (h, w):
+                np.copyto(dst, frame)
+            else:
+                cv2.resize(frame, (w, h), dst=dst)
+            self.ready_q.put((slot, seq, ts))
+            seq += 1
+        self.finished = True
+
+    def _free_slot(self):
+        # 丢帧模式下立即返回；否则等待空闲槽（采集随生成降速，用于离线录制文件源）
+        if self.drop_frames:
+            try:
+                return self.free_q.get_nowait()
+            except queue.Empty:
+                return None
+        while self.running:
+            try:
+                return self.free_q.get(timeout=0.1)
+            except queue.Empty:
+                pass
+        return None
+
+    @property
+    def done(self):
+        """源已读完且已入队的帧都处理完，或生成进程已退出"""
+        if self.exited or not self.process.is_alive():
+            return True
+        return self.finished and self.processed + self.dropped_frames >= self.captured
+
+    def on_result(self, slot, seq, ts, start, n, generate_s):
+        if slot is None:
+            # 生成进程退出时报告的事件环丢弃数
+            self.dropped_events = seq
+            self.exited = True
+            return
+        if n:
+            self.event_buffer.extend(self.events.read(start, n))
+            self.events.release(start + n)
+        self.processed += 1
+        self.n_events += n
+        self.generate_s += generate_s
+        # 只保留最新一帧用于显示，之前持有的槽归还给采集线程
+        if self.latest is not None:
+            self.free_q.put(self.latest[0])
+        self.latest = (slot, seq, ts)
+
+    def stop(self):
+        self.running = False
+        self.thread.join(timeout=2.0)
+        self.cam.release()
+        self.ready_q.put(None)
+
+    def close(self):
+        for q in (self.free_q, self.ready_q):
+            q.close()
+        self.frames.close()
+        self.frames.unlink()
+        self.events.close()
+        self.events.unlink()
+
+
+class MultiCameraPipeline:
+    """
+    多路视频源 → 每路独立的事件生成进程
+
+    sources:       视频源列表（摄像头编号 / 视频文件 / 图片目录），每路一个生成进程
+    event_buffers: 与 sources 等长的事件存储列表（需提供 extend，如 EventRingBuffer / EventFileWriter）；
+                   None 时各路使用 EventBuffer
+    slots / event_capacity: 每路帧槽数与事件环容量
+    camera_format: 传给 CameraStream 的格式参数（width / height / fps / fourcc / realtime 等）
+    drop_frames:   没有空闲帧槽时丢弃新帧（实时源）；False 时采集等待生成，不丢帧（离线录制文件源）
+    render:        生成进程同时输出事件图（写回帧槽，供 latest() 显示）；纯录制时可关闭
+    其余参数传给各路的 EventGenerator：threshold, decay, bg_color, roi, binning, workers,
+    log_intensity, rgb, time_surface, denoise_us（BA 滤波时间窗）, rate_budget / rate_tiles（事件率上限）
+
+    用法：start() 后周期性调用 poll() 收取各路结果，latest(i) 取第 i 路最新的帧与事件图，
+    stats() 为各路统计，stop() 结束并释放共享内存
+    """
+    def __init__(self, sources, event_buffers=None, slots=FRAME_SLOTS, event_capacity=EVENT_RING_CAPACITY,
+                 camera_format=None, drop_frames=True, **options):
+        self.sources = list(sources)
+        if event_buffers is None:
+            event_buffers = [EventBuffer() for _ in self.sources]
+        if len(event_buffers) != len(self.sources):
+            raise ValueError("event_buffers 与 sources 的个数不一致")
+        self.event_buffers = event_buffers
+        self.slots = max(3, int(slots))
+        self.event_capacity = int(event_capacity)
+        self.camera_format = camera_format or {}
+        self.drop_frames = drop_frames
+        self.options = options
+        self.channels = []
+        # spawn：各平台行为一致，且不会在已有采集线程时 fork
+        self._ctx = mp.get_context('spawn')
+        self._result_q = None
+        self._start_time = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def start(self):
+        self.channels = []
+        self._result_q = self._ctx.Queue()
+        try:
+            for k, source in enumerate(self.sources):
+                channel = _CameraChannel(k, source, self._ctx, self._result_q, self.event_buffers[k],
+                                         self.slots, self.event_capacity, self.options, self.camera_format,
+                                         self.drop_frames)
+                self.channels.append(channel)
+                channel.start()
+        except Exception:
+            self.stop()
+            raise
+        self._start_time = time.time()
+
+    def set_threshold(self, threshold):
+        for channel in self.channels:
+            channel.control[0] = threshold
+
+    def set_decay(self, decay):
+        for channel in self.channels:
+            channel.control[1] = decay
+
+    def poll(self, timeout=0.0):
+        """收取各路已完成的帧（事件写入对应的事件存储），返回本次收取的帧数"""
+        n = 0
+        while True:
+            try:
+                result = self._result_q.get(timeout=timeout) if n == 0 and timeout else self._result_q.get_nowait()
+            except queue.Empty:
+                return n
+            index = result[0]
+            self.channels[index].on_result(*result[1:])
+            n += 1
+
+    def latest(self, index):
+        """
+        第 index 路最新一帧：(BGR 帧, 事件图, 采集时间戳)，均为共享内存上的视图，
+        在下一次 poll() 之前有效；尚无结果时返回 None
+        """
+        channel = self.channels[index]
+        if channel.latest is None:
+            return None
+        slot, _, ts = channel.latest
+        images = channel.frames.images
+        return channel.frames.frames[slot], (images[slot] if images is not None else None), ts
+
+    @property
+    def finished(self):
+        """所有文件 / 目录源已读完且生成进程已处理完"""
+        return all(c.done for c in self.channels)
+
+    def stats(self):
+        """各路累计统计列表"""
+        elapsed = max(1e-9, time.time() - self._start_time) if self._start_time else 0.0
+        return [{
+            'source': c.source,
+            'captured': c.captured,
+            'processed': c.processed,
+            'dropped_frames': c.dropped_frames,
+            'events': c.n_events,
+            'dropped_events': c.dropped_events,
+            'process_fps': c.processed / elapsed if elapsed else 0.0,
+            'event_rate': c.n_events / elapsed if elapsed else 0.0,
+            'generate_ms': c.generate_s * 1e3 / c.processed if c.processed else 0.0,
+        } for c in self.channels]
+
+    def stop(self, timeout=5.0):
+        """停止采集，等待各生成进程处理完已入队的帧后退出，收取剩余结果并释放共享内存"""
+        for channel in self.channels:
+            channel.stop()
+        deadline = time.time() + timeout
+        while not all(c.exited for c in self.channels) and time.time() < deadline:
+            self.poll(timeout=0.1)
+        for channel in self.channels:
+            channel.process.join(timeout=max(0.0, deadline - time.time()))
+            if channel.process.is_alive():
+                channel.process.terminate()
+                channel.process.join()
+            channel.close()
+        if self._result_q is not None:
+            self._result_q.close()
+            self._result_q = None
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Record events from several video sources, "
+                                                 "one generator process per source.")
+    parser.add_argument('sources', nargs='+', help="camera indices, video files or image folders")
+    parser.add_argument('-o', '--out-dir', default='.', help="output directory for cam<k>.evt")
+    parser.add_argument('--seconds', type=float, default=0,
+                        help="stop after this many seconds (0 = until all file sources end)")
+    parser.add_argument('--threshold', type=int, default=15, help="generator threshold")
+    parser.add_argument('--workers', type=int, default=1, help="row-stripe threads per generator")
+    parser.add_argument('--log-intensity', action='store_true', help="DVS log-intensity model")
+    parser.add_argument('--denoise-us', type=int, default=0, help="background-activity filter window (0 = off)")
+    parser.add_argument('--no-realtime', action='store_true',
+                        help="read file sources as fast as possible instead of at their frame rate")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    sources = [int(s) if s.isdigit() else s for s in args.sources]
+    os.makedirs(args.out_dir, exist_ok=True)
+    writers = [EventFileWriter(os.path.join(args.out_dir, f"cam{k}.evt")) for k in range(len(sources))]
+    # 不按帧率节流时逐帧读取且不丢帧，录下文件中的每一帧
+    realtime = not args.no_realtime
+    pipeline = MultiCameraPipeline(sources, event_buffers=writers, render=False, drop_frames=realtime,
+                                   camera_format=dict(realtime=realtime, grab_latest=realtime),
+                                   threshold=args.threshold, workers=args.workers,
+                                   log_intensity=args.log_intensity, denoise_us=args.denoise_us)
+    pipeline.start()
+    for writer, channel in zip(writers, pipeline.channels):
+        writer.width, writer.height = channel.image_size
+    start = last = time.time()
+    try:
+        while not pipeline.finished and not (args.seconds and time.time() - start >= args.seconds):
+            pipeline.poll(timeout=0.1)
+            if time.time() - last >= 1.0:
+                last = time.time()
+                print(' | '.join(f"cam{k} {s['process_fps']:.1f} fps {s['event_rate'] / 1e6:.2f} Mev/s "
+                                 f"(dropped {s['dropped_frames']})"
+                                 for k, s in enumerate(pipeline.stats())), flush=True)
+    except KeyboardInterrupt:
+        pass
+    stats = pipeline.stats()
+    pipeline.stop()
+    for writer in writers:
+        writer.close()
+    for k, s in enumerate(stats):
+        print(f"cam{k} {s['source']}: {s['processed']}/{s['captured']} frames, {s['events']} events, "
+              f"{s['generate_ms']:.2f} ms/frame -> {writers[k].path}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
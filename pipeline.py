@@ -0,0 +1,320 @@
+# 文件：pipeline.py
+"""
+流式处理管线：帧源 → 事件生成 → 滤波 → 输出，各阶段均为惰性迭代器，逐帧流过，内存占用与时长无关
+
+    reader  = VideoReader('clip.mp4', gray=True)
+    frames  = video_frames(reader)                                   # Frame(index, timestamp, image)
+    batches = generate_events(frames, EventGenerator(event_buffer=DiscardEvents()), threshold=15)
+    batches = filter_batches(batches, BackgroundActivityFilter(30000))
+    run(batches, EventFileSink('clip.evt', reader.width, reader.height),
+        EventVideoSink('clip.avi', reader.fps, (reader.width, reader.height)))
+
+相邻阶段默认在同一线程中逐帧拉取；prefetch() 把上游放到后台线程、经有界队列交给下游，
+使两侧重叠执行（VideoReader 的解码线程即是这样接在最前面的）。
+"""
+import time
+import queue
+import threading
+from collections import namedtuple
+
+import cv2
+
+from event_file import EventFileWriter
+from stage_queue import StageQueue, BLOCK
+
+# 帧源产出的一帧：index 为帧号 / 采集序号，timestamp 为微秒时间戳，image 为灰度或 BGR 图像
+Frame = namedtuple('Frame', 'index timestamp image')
+# 生成阶段产出的一批事件：image 为事件图，frame 为原始输入帧（keep_frame=False 时为 None）
+EventBatch = namedtuple('EventBatch', 'index timestamp events image frame')
+
+_END = object()
+
+
+# ———— 帧源 ———— #
+
+def video_frames(reader, metrics=None):
+    """
+    VideoReader（视频文件 / 图片目录，后台预读）的帧；迭代结束或提前关闭时关闭 reader
+    metrics: 给出时把等待解码的时间计入 'read' 阶段
+    """
+    try:
+        while True:
+            if metrics is None:
+                item = reader.read()
+            else:
+                with metrics.time('read'):
+                    item = reader.read()
+            if item is None:
+                return
+            yield Frame(*item)
+    finally:
+        reader.close()
+
+
+def camera_frames(cam, running=lambda: True, metrics=None):
+    """
+    CameraStream 的实时帧，时间戳为采集时间；running() 返回 False 或文件源读完时结束
+    metrics: 给出时把取帧时间计入 'capture' 阶段，并累计 'frames_captured'
+    """
+    seq = 0
+    while running():
+        if metrics is None:
+            frame, ts = cam.read_with_timestamp()
+        else:
+            with metrics.time('capture'):
+                frame, ts = cam.read_with_timestamp()
+        if frame is None:
+            if cam.finished:
+                print("[pipeline] Video source finished")
+                return
+            print("[pipeline] Unable to read camera frames")
+            time.sleep(0.01)
+            continue
+        if metrics is not None:
+            metrics.count('frames_captured')
+        yield Frame(seq, ts, frame)
+        seq += 1
+
+
+def prefetch(iterable, size=4, stage_queue=None, on_idle=None, idle_s=0.1):
+    """
+    在后台线程中拉取上游迭代器，经有界队列交给下游，使上下游重叠执行
+
+    size:        队列长度（stage_queue 未给出时使用，满时上游等待）
+    stage_queue: 自定义的 StageQueue，可选择丢帧策略并统计丢弃数（实时源用）
+    on_idle:     下游每等待 idle_s 秒仍无数据时调用一次（如定时统计）
+    """
+    q = stage_queue if stage_queue is not None else StageQueue(size, BLOCK)
+    stop = threading.Event()
+    error = []
+
+    def put_end():
+        # 结束标记不能被丢帧策略丢掉，按阻塞方式放入
+        while not stop.is_set():
+            try:
+                q.put(_END, timeout=idle_s)
+                return
+            except queue.Full:
+                pass
+
+    def pump():
+        it = iter(iterable)
+        try:
+            for item in it:
+                if stop.is_set():
+                    return
+                if q.policy != BLOCK:
+                    q.push(item)
+                    continue
+                while True:
+                    try:
+                        q.put(item, timeout=idle_s)
+                        break
+                    except queue.Full:
+                        if stop.is_set():
+                            return
+        except BaseException as e:
+            error.append(e)
+        finally:
+            close = getattr(it, 'close', None)
+            if close is not None:
+                close()
+            put_end()
+
+    thread = threading.Thread(target=pump, daemon=True)
+    thread.start()
+    try:
+        while True:
+            item = q.pop(timeout=idle_s)
+            if item is None:
+                if on_idle is not None:
+                    on_idle()
+                continue
+            if item is _END:
+                break
+            yield item
+        if error:
+            raise error[0]
+    finally:
+        stop.set()
+        while q.pop_latest() is not None:
+            pass
+        thread.join(timeout=2.0)
+
+
+# ———— 处理阶段 ———— #
+
+def generate_events(frames, generator, keep_frame=False, fps=None, metrics=None, on_error=None, **params):
+    """
+    逐帧调用 generator.generate，产出 EventBatch
+
+    BGR 帧先转灰度；keep_frame 时在批次中保留原始输入帧（用于显示）
+    fps:     给出时时间戳按 index / fps 计算（视频时钟）；否则使用帧自带的时间戳
+    metrics: 给出时计时 'gray' / 'generate' 阶段，并累计 'frames' / 'events'
+    on_error: 给出时某帧处理出错调用 on_error(frame, exc) 并跳过该帧，管线继续；否则异常向上抛出
+    params:  传给 generate 的参数（threshold / decay / bg_color / polarity_*），可为常量，
+             或无参可调用对象（每帧取一次当前值，如界面滑块）
+    生成器自身的 event_buffer 仍会收到事件；事件只由下游输出时可传入 DiscardEvents()
+    """
+    for frame in frames:
+        try:
+            batch = _generate_batch(frame, generator, keep_frame, fps, metrics, params)
+        except Exception as e:
+            if on_error is None:
+                raise
+            on_error(frame, e)
+            continue
+        yield batch
+
+
+def _generate_batch(frame, generator, keep_frame, fps, metrics, params):
+    image = frame.image
+    if image.ndim == 3:
+        if metrics is None:
+            gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        else:
+            with metrics.time('gray'):
+                gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    else:
+        gray = image
+    timestamp = frame.timestamp if fps is None else int(round(frame.index * 1e6 / fps))
+    kwargs = {k: v() if callable(v) else v for k, v in params.items()}
+    if metrics is None:
+        events, event_img = generator.generate(gray, timestamp=timestamp, **kwargs)
+    else:
+        with metrics.time('generate'):
+            events, event_img = generator.generate(gray, timestamp=timestamp, **kwargs)
+        metrics.count('frames')
+        metrics.count('events', len(events))
+    return EventBatch(frame.index, timestamp, events, event_img, image if keep_frame else None)
+
+
+def filter_batches(batches, event_filter):
+    """
+    用 event_filter.filter(events)（如 BackgroundActivityFilter）滤除每批中的事件
+    滤波器按事件图的尺寸（输出网格）在首批及尺寸变化时 reset(width, height)
+    只作用于事件本身；需要事件图同步去掉噪声点时，把滤波器交给 EventGenerator(event_filter=...)
+    """
+    shape = None
+    for batch in batches:
+        if batch.image.shape[:2] != shape:
+            shape = batch.image.shape[:2]
+            event_filter.reset(shape[1], shape[0])
+        yield batch._replace(events=event_filter.filter(batch.events))
+
+
+# ———— 输出 ———— #
+
+class EventFileSink:
+    """事件追加写入 .evt 记录（见 event_file.py）"""
+    name = 'evt'
+
+    def __init__(self, path, width=0, height=0):
+        self.writer = EventFileWriter(path, width, height)
+
+    def __len__(self):
+        return len(self.writer)
+
+    def write(self, batch):
+        self.writer.append(batch.events)
+
+    def close(self):
+        self.writer.close()
+
+
+class EventStoreSink:
+    """事件送入任何提供 extend() 的存储（EventBuffer / EventRingBuffer / EventWindowAccumulator 等）"""
+    name = 'store'
+
+    def __init__(self, store):
+        self.store = store
+
+    def write(self, batch):
+        self.store.extend(batch.events)
+
+    def close(self):
+        pass
+
+
+class EventVideoSink:
+    """事件图逐帧写成视频"""
+    name = 'write'
+
+    def __init__(self, path, fps, size, fourcc='XVID'):
+        self.out = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*fourcc), fps, size)
+
+    def write(self, batch):
+        self.out.write(batch.image)
+
+    def close(self):
+        self.out.release()
+
+
+class MetricsSink:
+    """
+    每 report_every 帧输出一次指标快照（写入 metrics 的 sink），结束时再输出一次（done=True）
+    event_filter: 给出时同时记录其累计滤除的事件数 'events_denoised'
+    extra:        附加到每个快照中的字段（如 source）
+    """
+    name = None
+
+    def __init__(self, metrics, report_every=50, event_filter=None, **extra):
+        self.metrics = metrics
+        self.report_every = report_every
+        self.event_filter = event_filter
+        self.extra = extra
+        self.n = 0
+        self.last_index = None
+
+    def _report(self, **extra):
+        if self.event_filter is not None:
+            self.metrics.set('events_denoised', self.event_filter.removed)
+        return self.metrics.report(**self.extra, **extra)
+
+    def write(self, batch):
+        self.n += 1
+        self.last_index = batch.index
+        if self.report_every and self.n % self.report_every == 0:
+            self._report(frame=batch.index)
+
+    def close(self):
+        self._report(frame=self.last_index, done=True)
+
+
+class CallbackSink:
+    """每批调用 fn(batch)；name 为 None 时 run() 不对其计时"""
+    def __init__(self, fn, name='callback'):
+        self.fn = fn
+        self.name = name
+
+    def write(self, batch):
+        self.fn(batch)
+
+    def close(self):
+        pass
+
+
+def run(batches, *sinks, metrics=None):
+    """
+    驱动整条管线：每批依次交给各输出；结束（或出错）时关闭上游管线（停止其后台线程）与所有输出
+    metrics: 给出时按各输出的 name 计时
+    返回 (批次数, 事件数)
+    """
+    n_batches = n_events = 0
+    try:
+        for batch in batches:
+            for sink in sinks:
+                if metrics is None or sink.name is None:
+                    sink.write(batch)
+                else:
+                    with metrics.time(sink.name):
+                        sink.write(batch)
+            n_batches += 1
+            n_events += len(batch.events)
+    finally:
+        close = getattr(batches, 'close', None)
+        if close is not None:
+            close()
+        for sink in sinks:
+            sink.close()
+    return n_batches, n_events
@@ -0,0 +1,104 @@
+# 文件：rate_controller.py
+import numpy as np
+import cv2
+
+# 每帧阈值倍率的最大调整幅度，避免在突发事件下剧烈振荡
+MAX_STEP = 1.5
+
+
+class ThresholdController:
+    """
+    事件率上限的自适应阈值控制：跟踪输出事件率（事件/秒），超出带宽预算时提高阈值，
+    回落后逐步恢复到用户设定的阈值（倍率不低于 1，即只会比设定值更不灵敏）
+
+    max_rate:  事件率预算（事件/秒）
+    tiles:     (行数, 列数)；(1, 1) 为全局单一阈值。分块时按“注水”方式分配预算：
+               求一个单块上限 c 使 Σ min(块事件率, c) = 预算，只有超过 c 的繁忙块被提高阈值，
+               安静区域保持原有灵敏度
+    gain:      每帧倍率按 (事件率 / 上限)^gain 调整（再限制在 1/MAX_STEP..MAX_STEP 之间）
+    max_scale: 阈值倍率上限
+    smoothing: 事件率的指数平滑系数（新值所占权重）
+    """
+    def __init__(self, max_rate, tiles=(1, 1), gain=0.5, max_scale=8.0, smoothing=0.5):
+        self.max_rate = float(max_rate)
+        self.tiles = (max(1, int(tiles[0])), max(1, int(tiles[1])))
+        self.gain = gain
+        self.max_scale = max_scale
+        self.smoothing = smoothing
+        self.scale = np.ones(self.tiles, dtype=np.float32)
+        self.rate = np.zeros(self.tiles, dtype=np.float64)
+        self.base = None
+        self._last_ts = None
+        self._map = None
+        self._map_key = None
+
+    @property
+    def total_rate(self):
+        """平滑后的总事件率（事件/秒）"""
+        return float(self.rate.sum())
+
+    @property
+    def effective_threshold(self):
+        """各块实际阈值的平均值（供界面显示）；尚未调用 threshold() 时为 None"""
+        return None if self.base is None else float(self.base * self.scale.mean())
+
+    def reset(self):
+        self.scale.fill(1.0)
+        self.rate.fill(0.0)
+        self._last_ts = None
+
+    def threshold(self, base, shape):
+        """
+        本帧使用的阈值：全局模式返回标量，分块模式返回 shape 大小的 float32 逐像素阈值图
+        """
+        self.base = base
+        if self.tiles == (1, 1):
+            return base * float(self.scale[0, 0])
+        h, w = shape
+        key = (shape, base, self.scale.tobytes())
+        if self._map_key != key:
+            # 块倍率按最近邻放大到整帧（块边界与 update() 中的划分一致）
+            self._map = cv2.resize(self.scale * np.float32(base), (w, h), interpolation=cv2.INTER_NEAREST)
+            self._map_key = key
+        return self._map
+
+    def _tile_rates(self, events, shape, dt):
+        th, tw = self.tiles
+        if (th, tw) == (1, 1):
+            return np.array([[len(events) / dt]])
+        h, w = shape
+        ty = events['y'].astype(np.int64) * th // h
+        tx = events['x'].astype(np.int64) * tw // w
+        counts = np.bincount(ty * tw + tx, minlength=th * tw)
+        return counts.reshape(th, tw) / dt
+
+    def _limits(self):
+        # 注水：按事件率升序，找到单块上限 c，使不超过 c 的块照常输出、其余块各占 c
+        rates = np.sort(self.rate.ravel())
+        n = len(rates)
+        below = np.concatenate([[0.0], np.cumsum(rates)[:-1]])
+        caps = (self.max_rate - below) / (n - np.arange(n))
+        k = np.flatnonzero(caps <= rates)
+        return caps[k[0]] if len(k) else np.inf
+
+    def update(self, events, timestamp, shape):
+        """根据本帧输出的事件（及其采集时间戳，微秒）更新事件率与阈值倍率"""
+        if self._last_ts is None or timestamp <= self._last_ts:
+            self._last_ts = timestamp
+            return
+        dt = (timestamp - self._last_ts) / 1e6
+        self._last_ts = timestamp
+
+        rates = self._tile_rates(events, shape, dt)
+        self.rate += self.smoothing * (rates - self.rate)
+
+        limit = self._limits()
+        if np.isinf(limit):
+            # 总量在预算内：所有块按总事件率与预算之比向设定阈值恢复，接近预算时恢复得慢
+            factor = np.full(self.tiles, (self.total_rate / self.max_rate) ** self.gain)
+        else:
+            with np.errstate(divide='ignore'):
+                factor = (self.rate / limit) ** self.gain
+        np.clip(factor, 1.0 / MAX_STEP, MAX_STEP, out=factor)
+        self.scale *= factor.astype(np.float32)
+        np.clip(self.scale, 1.0, self.max_scale, out=self.scale)
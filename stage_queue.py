@@ -0,0 +1,60 @@
+# 文件：stage_queue.py
+import queue
+
+# 队列满时的处理策略
+DROP_OLDEST = 'drop_oldest'   # 丢弃最旧的一项，保证下游总拿到最新数据
+DROP_NEWEST = 'drop_newest'   # 丢弃新到的一项
+BLOCK       = 'block'         # 阻塞生产者（上游随之降速）
+
+
+class StageQueue(queue.Queue):
+    """
+    流水线阶段之间的有界队列：满时按策略处理，并统计被丢弃的项数
+    """
+    def __init__(self, maxsize=4, policy=DROP_OLDEST):
+        if policy not in (DROP_OLDEST, DROP_NEWEST, BLOCK):
+            raise ValueError(f"未知的队列策略：{policy}")
+        super().__init__(maxsize)
+        self.policy = policy
+        self.dropped = 0
+
+    def push(self, item, timeout=None):
+        """按策略入队；返回 item 是否入队成功"""
+        if self.policy == BLOCK:
+            try:
+                self.put(item, timeout=timeout)
+                return True
+            except queue.Full:
+                self.dropped += 1
+                return False
+        with self.not_full:
+            if 0 < self.maxsize <= self._qsize():
+                self.dropped += 1
+                if self.policy == DROP_NEWEST:
+                    return False
+                self._get()
+                self.unfinished_tasks -= 1
+            self._put(item)
+            self.unfinished_tasks += 1
+            self.not_empty.notify()
+        return True
+
+    def pop(self, timeout=None):
+        """出队；超时返回 None"""
+        try:
+            return self.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def pop_latest(self):
+        """取出队列中最新的一项并丢弃更旧的；队列为空时返回 None"""
+        with self.mutex:
+            if not self._qsize():
+                return None
+            while self._qsize() > 1:
+                self._get()
+                self.unfinished_tasks -= 1
+                self.dropped += 1
+            item = self._get()
+            self.not_full.notify()
+            return item
@@ -0,0 +1,25 @@
+import os
+import sys
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from camera_stream import VideoReader
+
+
+def test_image_folder_step(tmp_path):
+    images = [np.full((24, 32), 10 * i, dtype=np.uint8) for i in range(10)]
+    for i, image in enumerate(images):
+        cv2.imwrite(str(tmp_path / f"frame{i}.png"), image)
+    reader = VideoReader(str(tmp_path), start=1, step=3, gray=True)
+    frames = []
+    while True:
+        item = reader.read()
+        if item is None:
+            break
+        frames.append(item)
+    reader.close()
+    assert [index for index, _, _ in frames] == [1, 4, 7]
+    for index, _, image in frames:
+        assert np.array_equal(image, images[index])
@@ -0,0 +1,35 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmark import write_video
+from event_file import EventFileReader
+from main2 import convert_video
+
+
+@pytest.fixture(scope='module')
+def video(tmp_path_factory):
+    path = str(tmp_path_factory.mktemp('video') / 'pan.avi')
+    write_video(path, 'pan', 160, 120, 40)
+    return path
+
+
+def convert(video, tmp_path, name, **params):
+    evt_path = str(tmp_path / f"{name}.evt")
+    convert_video(video, None, evt_path, verbose=False, **params)
+    return np.asarray(EventFileReader(evt_path).events)
+
+
+@pytest.mark.parametrize('range_params', [{}, dict(start=5, end=35, step=2), dict(denoise_us=100000),
+                                          dict(start=5, end=35, step=2, denoise_us=100000)])
+@pytest.mark.parametrize('log_intensity', [False, True])
+def test_parallel_matches_sequential(video, tmp_path, log_intensity, range_params):
+    sequential = convert(video, tmp_path, 'seq', log_intensity=log_intensity, **range_params)
+    parallel = convert(video, tmp_path, 'par', processes=3, log_intensity=log_intensity, **range_params)
+    assert len(sequential) > 0
+    assert sequential.tobytes() == parallel.tobytes()
+
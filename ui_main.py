@@ -2,7 +2,7 @@
 # ui_main.py
 from PyQt5.QtWidgets import (
     QWidget, QLabel, QVBoxLayout, QHBoxLayout, QPushButton,
-    QSlider, QComboBox, QFileDialog, QFrame
+    QSlider, QComboBox, QFileDialog, QFrame, QProgressBar
 )
 from PyQt5.QtCore import Qt
 from PyQt5.QtGui import QImage, QPixmap
@@ -59,8 +59,21 @@ class EventCameraUI(QWidget):
         # 保存事件日志按钮
         self.save_csv_btn = QPushButton("📄 Save CSV")
         self.save_npz_btn = QPushButton("📦 Save NPZ")
+        self.save_evt_btn = QPushButton("🗂 Save EVT")
+        self.save_packed_btn = QPushButton("🗜 Save Packed")
         control_panel.addWidget(self.save_csv_btn)
         control_panel.addWidget(self.save_npz_btn)
+        control_panel.addWidget(self.save_evt_btn)
+        control_panel.addWidget(self.save_packed_btn)
+
+        # 后台保存进度与取消
+        self.save_progress = QProgressBar()
+        self.save_progress.setRange(0, 100)
+        self.save_progress.setVisible(False)
+        self.cancel_save_btn = QPushButton("✖ Cancel Saving")
+        self.cancel_save_btn.setVisible(False)
+        control_panel.addWidget(self.save_progress)
+        control_panel.addWidget(self.cancel_save_btn)
 
         # 【新增】帧率实时显示
         self.fps_label = QLabel("FPS: 0")
@@ -72,6 +85,21 @@ class EventCameraUI(QWidget):
         self.event_rate_label.setStyleSheet("font-weight: bold; font-size: 18px; color: #0077cc;")
         control_panel.addWidget(self.event_rate_label)
 
+        # 事件率上限控制下实际生效的阈值
+        self.threshold_label = QLabel("Effective Threshold: -")
+        self.threshold_label.setStyleSheet("font-weight: bold; font-size: 18px; color: #8d5524;")
+        control_panel.addWidget(self.threshold_label)
+
+        # 端到端延迟（采集 → 显示）
+        self.latency_label = QLabel("Latency: 0 ms")
+        self.latency_label.setStyleSheet("font-weight: bold; font-size: 18px; color: #2a9d8f;")
+        control_panel.addWidget(self.latency_label)
+
+        # 各阶段耗时（p50 / p99），等宽字体便于对齐
+        self.stage_label = QLabel("")
+        self.stage_label.setStyleSheet("font-family: monospace; font-size: 13px; color: #444444;")
+        control_panel.addWidget(self.stage_label)
+
         # 完成布局
         main_layout.addLayout(control_panel, 1)
         self.setLayout(main_layout)
@@ -1,7 +1,6 @@
 # utils.py
 import numpy as np
 import cv2
-from PyQt5.QtGui import QImage, QPixmap
 
 def get_background_canvas(height, width, color=(255, 255, 255)):
     """
@@ -15,6 +14,8 @@ def cv2_to_qpixmap(cv_img_bgr):
     """
     OpenCV图像转QPixmap（用于PyQt显示）
     """
+    # 延迟导入，无界面的脚本导入本模块时不加载 Qt
+    from PyQt5.QtGui import QImage, QPixmap
     h, w, ch = cv_img_bgr.shape
     img_rgb = cv2.cvtColor(cv_img_bgr, cv2.COLOR_BGR2RGB)
     qimg = QImage(img_rgb.data, w, h, 3 * w, QImage.Format_RGB888)
@@ -2,100 +2,218 @@ import cv2
 import numpy as np
 import matplotlib.pyplot as plt
 import math
+import struct
+
+from camera_stream import VideoReader
 
 # ———– 用户设置 ———–
 input_path      = "output.mp4"             # 输入视频路径（已裁剪）
 output_path     = "output_annotated.avi"  # 带标注的视频输出路径
 area_plot_path  = "area_plot.png"         # 面积折线图输出路径
+series_path     = "area_series.npy"       # 逐帧面积 / 圆度 / 外接框（边处理边写出，见 SeriesWriter）
+
+start_frame     = 0       # 从该帧开始分析
+end_frame       = None    # 在该帧之前结束，None 为到视频结尾
 
 gray_threshold  = 50      # 黑色区域阈值上限（0~255），越小越严格
+track_roi       = False   # 跟踪黑色区域外接框，只处理其周围的 ROI（更快）；丢失时回到整帧检测
+                          # 注意：ROI 外新出现的更大区域要到下次整帧检测才会发现，面积结果可能与整帧检测不同
+roi_margin      = 0.5     # ROI 在外接框四周各留出的边距（相对外接框宽高的比例）
+roi_min_margin  = 16      # 边距下限（像素）
+redetect_every  = 300     # 跟踪时每隔多少帧做一次整帧检测（0 为从不），防止错过别处出现的更大区域
+write_video     = True    # False 时不写标注视频（只做分析，速度更快）
+show_plot       = True    # 结束后弹出面积折线图
 # ——————————————
 
+# 逐帧结果记录：tracked 为 1 表示该帧只处理了跟踪 ROI
+SERIES_DTYPE = np.dtype([('frame', np.int32), ('area', np.float32), ('circularity', np.float32),
+                         ('x', np.int32), ('y', np.int32), ('w', np.int32), ('h', np.int32),
+                         ('tracked', np.uint8)])
+
 def circularity(area, perimeter):
     """计算轮廓圆度：4πA / P^2"""
     if perimeter == 0:
         return 0.0
     return 4 * math.pi * area / (perimeter * perimeter)
 
+class SeriesWriter:
+    """
+    逐帧结果流式写为 .npy（SERIES_DTYPE 结构化数组）：记录先攒在定长缓冲里，满了整块追加到文件，
+    文件头中的行数在每次 flush / close 时回填，内存占用与视频长度无关。
+    可用 np.load(path, mmap_mode='r') 读取（未关闭的文件也可读到最近一次 flush 的内容）
+    """
+    HEADER_SIZE = 256    # 固定长度的 .npy 文件头（含魔数），回填行数时不改变数据偏移
+
+    def __init__(self, path, chunk_size=4096):
+        self.path = path
+        self.n_rows = 0
+        self._buf = np.empty(chunk_size, dtype=SERIES_DTYPE)
+        self._k = 0
+        self._file = open(path, 'wb')
+        self._write_header()
+
+    def __len__(self):
+        return self.n_rows + self._k
+
+    def _write_header(self):
+        magic = np.lib.format.magic(1, 0)
+        header = repr({'descr': np.lib.format.dtype_to_descr(SERIES_DTYPE),
+                       'fortran_order': False, 'shape': (self.n_rows,)})
+        header_len = self.HEADER_SIZE - len(magic) - 2
+        self._file.seek(0)
+        self._file.write(magic + struct.pack('<H', header_len) + header.ljust(header_len - 1).encode('latin1') + b'\n')
+        self._file.seek(0, 2)
+
+    def append(self, frame, area, circ, bbox, tracked):
+        row = self._buf[self._k]
+        row['frame'], row['area'], row['circularity'], row['tracked'] = frame, area, circ, tracked
+        row['x'], row['y'], row['w'], row['h'] = bbox
+        self._k += 1
+        if self._k == len(self._buf):
+            self.flush()
+
+    def flush(self):
+        self._buf[:self._k].tofile(self._file)
+        self.n_rows += self._k
+        self._k = 0
+        self._write_header()
+        self._file.flush()
+
+    def close(self):
+        if not self._file.closed:
+            self.flush()
+            self._file.close()
+
+def largest_contour(bw, offset=(0, 0)):
+    """二值图中面积最大的外轮廓及其面积（坐标加上 offset）；没有轮廓时返回 (None, 0.0)"""
+    contours, _ = cv2.findContours(bw, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE, offset=offset)
+    if not contours:
+        return None, 0.0
+    areas = [cv2.contourArea(c) for c in contours]
+    k = int(np.argmax(areas))
+    return contours[k], areas[k]
+
+def detect(frame, roi=None):
+    """
+    在整帧或 roi=(x0, y0, x1, y1) 内找最大黑色区域，返回 (轮廓, 面积)
+    ROI 模式只对 ROI 做灰度转换与二值化，轮廓坐标仍为整帧坐标
+    """
+    if roi is None:
+        x0, y0 = 0, 0
+        patch = frame
+    else:
+        x0, y0, x1, y1 = roi
+        patch = frame[y0:y1, x0:x1]
+    gray = cv2.cvtColor(patch, cv2.COLOR_BGR2GRAY)
+    # 黑色区域→白（255），背景→黑（0）
+    _, bw = cv2.threshold(gray, gray_threshold, 255, cv2.THRESH_BINARY_INV)
+    return largest_contour(bw, (x0, y0))
+
+def next_roi(bbox, width, height):
+    """外接框四周加边距、裁到画面内，作为下一帧的处理区域"""
+    x, y, w, h = bbox
+    mx = max(roi_min_margin, int(w * roi_margin))
+    my = max(roi_min_margin, int(h * roi_margin))
+    return max(0, x - mx), max(0, y - my), min(width, x + w + mx), min(height, y + h + my)
+
+def touches_border(bbox, roi, width, height):
+    """外接框贴到 ROI 边缘（且不是画面边缘）：区域可能延伸到 ROI 之外，需整帧重新检测"""
+    x, y, w, h = bbox
+    x0, y0, x1, y1 = roi
+    return ((x <= x0 and x0 > 0) or (y <= y0 and y0 > 0) or
+            (x + w >= x1 and x1 < width) or (y + h >= y1 and y1 < height))
+
+def annotate(frame, cnt, frame_idx, area, circ):
+    """在帧上绘制轮廓与数值"""
+    if cnt is not None:
+        cv2.drawContours(frame, [cnt], -1, (0,0,255), 2)
+    cv2.putText(frame, f"Frame: {frame_idx}", (10,30),
+                cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255,255,255), 2)
+    cv2.putText(frame, f"Area: {area:.1f}", (10,60),
+                cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255,255,255), 2)
+    cv2.putText(frame, f"Circ: {circ:.3f}", (10,90),
+                cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255,255,255), 2)
+
 def main():
-    cap = cv2.VideoCapture(input_path)
-    if not cap.isOpened():
+    # 后台线程预读解码，分析与解码重叠进行
+    try:
+        reader = VideoReader(input_path, start=start_frame, end=end_frame)
+    except IOError:
         print(f"无法打开视频文件：{input_path}")
         return
 
     # 视频参数
-    fps    = cap.get(cv2.CAP_PROP_FPS)
-    width  = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
-    height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
-    fourcc = cv2.VideoWriter_fourcc(*"XVID")
-    out    = cv2.VideoWriter(output_path, fourcc, fps, (width, height))
-
-    areas     = []
-    circs     = []
+    fps    = reader.fps
+    width  = reader.width
+    height = reader.height
+    out = None
+    if write_video:
+        fourcc = cv2.VideoWriter_fourcc(*"XVID")
+        out    = cv2.VideoWriter(output_path, fourcc, fps, (width, height))
+
+    series    = SeriesWriter(series_path)
     best_circ = 0.0
     best_frame_idx = 0
-    frame_idx = 0
-
-    while True:
-        ret, frame = cap.read()
-        if not ret:
-            break
-
-        # 转灰度并二值化：黑色区域→白（255），背景→黑（0）
-        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-        _, bw = cv2.threshold(gray, gray_threshold, 255, cv2.THRESH_BINARY_INV)
-
-        # 查找所有外轮廓
-        contours, _ = cv2.findContours(bw, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-
-        if contours:
-            # 最大面积轮廓
-            cnt = max(contours, key=cv2.contourArea)
-            area = cv2.contourArea(cnt)
-            peri = cv2.arcLength(cnt, True)
-            circ = circularity(area, peri)
+    n_frames  = 0
+    roi       = None    # 跟踪中的处理区域 (x0, y0, x1, y1)；None 表示下一帧整帧检测
+    n_tracked = 0
+
+    for frame_idx, _, frame in reader:
+        if redetect_every and frame_idx % redetect_every == 0:
+            roi = None
+        cnt, area = detect(frame, roi) if roi is not None else (None, 0.0)
+        tracked = cnt is not None
+        if tracked:
+            bbox = cv2.boundingRect(cnt)
+            # 在 ROI 中丢失或被 ROI 截断：本帧回到整帧检测
+            tracked = not touches_border(bbox, roi, width, height)
+        if not tracked:
+            cnt, area = detect(frame)
+        if cnt is not None:
+            bbox = cv2.boundingRect(cnt)
+            circ = circularity(area, cv2.arcLength(cnt, True))
+            roi = next_roi(bbox, width, height) if track_roi else None
         else:
-            area = 0.0
-            circ = 0.0
+            bbox = (0, 0, 0, 0)
+            area = circ = 0.0
+            roi = None
+        n_tracked += tracked
 
-        areas.append(area)
-        circs.append(circ)
+        series.append(frame_idx, area, circ, bbox, tracked)
 
         # 更新最佳圆度帧
         if circ > best_circ:
             best_circ = circ
             best_frame_idx = frame_idx
 
-        # 在帧上绘制轮廓与数值
-        if contours:
-            cv2.drawContours(frame, [cnt], -1, (0,0,255), 2)
-        cv2.putText(frame, f"Frame: {frame_idx}", (10,30),
-                    cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255,255,255), 2)
-        cv2.putText(frame, f"Area: {area:.1f}", (10,60),
-                    cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255,255,255), 2)
-        cv2.putText(frame, f"Circ: {circ:.3f}", (10,90),
-                    cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255,255,255), 2)
-
-        # 写入输出视频（无窗口显示）
-        out.write(frame)
-        frame_idx += 1
+        if out is not None:
+            annotate(frame, cnt, frame_idx, area, circ)
+            # 写入输出视频（无窗口显示）
+            out.write(frame)
+        n_frames += 1
 
     # 释放视频资源
-    cap.release()
-    out.release()
+    reader.close()
+    if out is not None:
+        out.release()
+    series.close()
 
     # 打印最接近圆形的帧号及圆度
     print(f"最接近圆形的帧号：{best_frame_idx}  (圆度={best_circ:.3f})")
+    if n_frames:
+        print(f"共 {n_frames} 帧，其中 {n_tracked} 帧只处理了跟踪 ROI；逐帧结果：{series_path}")
 
-    # 绘制、保存并展示面积折线图
+    # 绘制、保存并展示面积折线图（从结果文件内存映射读取）
+    records = np.load(series_path, mmap_mode='r')
     plt.figure(figsize=(10, 4))
-    plt.plot(areas, linewidth=1)
+    plt.plot(records['frame'], records['area'], linewidth=1)
     plt.xlabel("Frame Index")
     plt.ylabel("Black Region Area (pixels)")
     plt.title("Center Black Area over Frames")
     plt.tight_layout()
     plt.savefig(area_plot_path, dpi=150)
-    plt.show()    # 弹出展示折线图
+    if show_plot:
+        plt.show()    # 弹出展示折线图
     plt.close()
 
 if __name__ == "__main__":